@@ -4,27 +4,50 @@ Uses SQLAlchemy with async support for production scalability.
 """
 
 import os
+import time
+import asyncio
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, Final
 from contextlib import asynccontextmanager
 
-from sqlalchemy import create_engine, text, Column, Integer, String, DateTime, Boolean, JSON, func
+from sqlalchemy import create_engine, text, inspect, Index, Column, Integer, SmallInteger, String, DateTime, Boolean, JSON, func, case, literal
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy import select, insert, update, delete
+from sqlalchemy import select, insert, update, delete, bindparam, lambda_stmt, event
 
 from models.ticket import TeamMapping, DepartmentType, TicketPriority, ProcessedTicket
+from utils.logger import logger, TICKET_LOGS_DROPPED
 
 # Database configuration
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./tickets.db")
 Base = declarative_base()
 
+# Numeric ordering of ticket priorities, used for team mapping thresholds
+PRIORITY_RANK: Final[Dict[str, int]] = {"low": 1, "medium": 2, "high": 3, "critical": 4}
+
+# Ticket log columns refreshed when an already-logged ticket is upserted again
+TICKET_LOG_UPDATE_FIELDS = (
+    "department",
+    "assigned_to",
+    "status",
+    "confidence_score",
+    "external_ticket_id",
+    "routed_to_system",
+    "error_message",
+    "updated_at",
+)
+
 
 class TeamMappingDB(Base):
     """SQLAlchemy model for team mapping table"""
     __tablename__ = "team_mappings"
+    __table_args__ = (
+        # Matches get_team_mapping: department/is_active filter ordered by priority_rank
+        Index("ix_team_mappings_dept_active", "department", "is_active", "priority_rank"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     department = Column(String(50), nullable=False, index=True)
@@ -33,14 +56,19 @@ class TeamMappingDB(Base):
     api_method = Column(String(10), default="POST")
     api_headers = Column(JSON, default=dict)
     priority_threshold = Column(String(20), default="low")
+    priority_rank = Column(SmallInteger, index=True)  # Numeric form of priority_threshold for ordering
     is_active = Column(Boolean, default=True, index=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
 
 class TicketLogDB(Base):
     """SQLAlchemy model for ticket processing log"""
     __tablename__ = "ticket_logs"
+    __table_args__ = (
+        # Covers the get_metrics GROUP BY department with per-status counts
+        Index("ix_ticket_logs_dept_status", "department", "status"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     ticket_id = Column(String(100), nullable=False, unique=True, index=True)
@@ -56,8 +84,81 @@ class TicketLogDB(Base):
     routed_to_system = Column(String(50))
     ticket_metadata = Column(JSON, default=dict)
     error_message = Column(String(1000))
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.now(), index=True)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+# Enum lookups by stored value, avoiding Enum(value) resolution per row
+_DEPARTMENT_BY_VALUE = {department.value: department for department in DepartmentType}
+_PRIORITY_BY_VALUE = {priority.value: priority for priority in TicketPriority}
+
+
+def _row_to_mapping(row) -> TeamMapping:
+    """Build a TeamMapping from a TeamMappingDB entity or column row"""
+    return TeamMapping(
+        id=row.id,
+        department=_DEPARTMENT_BY_VALUE[row.department],
+        team_name=row.team_name,
+        api_endpoint=row.api_endpoint,
+        api_method=row.api_method,
+        api_headers=row.api_headers or {},
+        priority_threshold=_PRIORITY_BY_VALUE[row.priority_threshold],
+        is_active=row.is_active,
+        created_at=row.created_at,
+        updated_at=row.updated_at
+    )
+
+
+# Hot-path statements built once; lambda_stmt caches the construct and skips AST rebuilds per call
+BEST_TEAM_MAPPING_STMT = lambda_stmt(
+    lambda: select(TeamMappingDB)
+    .where(
+        TeamMappingDB.department == bindparam("department"),
+        TeamMappingDB.is_active.is_(True),
+        TeamMappingDB.priority_rank <= bindparam("priority_rank")
+    )
+    .order_by(TeamMappingDB.priority_rank.desc())
+    .limit(1)
+)
+
+FALLBACK_TEAM_MAPPING_STMT = lambda_stmt(
+    lambda: select(TeamMappingDB)
+    .where(
+        TeamMappingDB.department == bindparam("department"),
+        TeamMappingDB.is_active.is_(True)
+    )
+    .order_by(TeamMappingDB.priority_rank.asc())
+    .limit(1)
+)
+
+ACTIVE_TEAM_MAPPINGS_STMT = lambda_stmt(
+    lambda: select(
+        TeamMappingDB.id,
+        TeamMappingDB.department,
+        TeamMappingDB.team_name,
+        TeamMappingDB.api_endpoint,
+        TeamMappingDB.api_method,
+        TeamMappingDB.api_headers,
+        TeamMappingDB.priority_threshold,
+        TeamMappingDB.is_active,
+        TeamMappingDB.created_at,
+        TeamMappingDB.updated_at
+    ).where(TeamMappingDB.is_active.is_(True))
+)
+
+TICKET_BY_ID_STMT = lambda_stmt(
+    lambda: select(TicketLogDB)
+    .where(TicketLogDB.ticket_id == bindparam("ticket_id"))
+    .limit(1)
+)
+
+TICKET_METRICS_STMT = lambda_stmt(
+    lambda: select(
+        TicketLogDB.department,
+        func.count(TicketLogDB.id).label("total"),
+        func.sum(case((TicketLogDB.status == "routed", 1), else_=0)).label("success")
+    ).group_by(TicketLogDB.department)
+)
 
 
 class DatabaseManager:
@@ -68,26 +169,95 @@ class DatabaseManager:
 
     def __init__(self, database_url: str = None):
         self.database_url = database_url or DATABASE_URL
-        self.engine = create_async_engine(
-            self.database_url,
-            echo=False,  # Set to True for SQL debugging
-            pool_pre_ping=True,  # Verify connections before use
-            pool_recycle=3600,  # Recycle connections every hour
+
+        engine_options = {
+            "echo": False,  # Set to True for SQL debugging
+            "pool_pre_ping": True,  # Verify connections before use
+            "pool_recycle": 3600,  # Recycle connections every hour
+            "insertmanyvalues_page_size": 500,  # Bound rows per multi-row INSERT on batched log flushes
+        }
+
+        # Queue pool tuning does not apply to SQLite's pool implementation
+        if not self.database_url.startswith("sqlite"):
+            engine_options.update(
+                pool_use_lifo=True,  # Reuse warm connections first
+                pool_size=int(os.getenv("DB_POOL_SIZE", "20")),
+                max_overflow=int(os.getenv("DB_POOL_OVERFLOW", "10")),
+                pool_timeout=30,
+            )
+
+        self.engine = create_async_engine(self.database_url, **engine_options)
+
+        if self.database_url.startswith("sqlite"):
+            # WAL with relaxed fsync: commits no longer sync the file one by one
+            @event.listens_for(self.engine.sync_engine, "connect")
+            def _sqlite_pragmas(dbapi_connection, connection_record):
+                cursor = dbapi_connection.cursor()
+                cursor.execute("PRAGMA journal_mode=WAL")
+                cursor.execute("PRAGMA synchronous=NORMAL")
+                cursor.execute("PRAGMA temp_store=MEMORY")
+                cursor.close()
+
+        # Dialect-specific upsert: insert new tickets, update processing fields on conflict
+        dialect_insert = postgresql.insert if self.engine.dialect.name == "postgresql" else sqlite.insert
+        # Timestamps come from the DB clock, also for tables created before the server defaults
+        upsert = dialect_insert(TicketLogDB).values(created_at=func.now(), updated_at=func.now())
+        self._ticket_log_upsert = upsert.on_conflict_do_update(
+            index_elements=[TicketLogDB.ticket_id],
+            set_={field: upsert.excluded[field] for field in TICKET_LOG_UPDATE_FIELDS}
         )
+
         self.async_session = async_sessionmaker(
             self.engine,
             class_=AsyncSession,
             expire_on_commit=False
         )
 
+        # Team mappings change rarely, so lookups are cached in-process for a short TTL
+        self._mapping_cache: Dict[Tuple[str, str], Tuple[float, TeamMapping]] = {}
+        self._cache_ttl = 60.0
+
+        # Ticket logs are queued and flushed in batches by a background task
+        self._log_queue: asyncio.Queue = asyncio.Queue(maxsize=10_000)
+        self._flush_batch_size = 500
+        self._flush_interval = 0.05  # seconds
+        self._flusher: Optional[asyncio.Task] = None
+
     async def initialize_database(self):
         """Create tables and insert default team mappings"""
         async with self.engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            await self._migrate_priority_rank(conn)
+            await conn.run_sync(self._create_missing_indexes)
 
         # Insert default team mappings if none exist
         await self._insert_default_mappings()
 
+        # Start background ticket log flusher
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def _migrate_priority_rank(self, conn):
+        """Add and backfill team_mappings.priority_rank on databases created before the column existed"""
+        columns = await conn.run_sync(
+            lambda sync_conn: {column["name"] for column in inspect(sync_conn).get_columns("team_mappings")}
+        )
+        if "priority_rank" not in columns:
+            await conn.execute(text("ALTER TABLE team_mappings ADD COLUMN priority_rank SMALLINT"))
+
+        await conn.execute(
+            update(TeamMappingDB)
+            .where(TeamMappingDB.priority_rank.is_(None))
+            .values(priority_rank=case(PRIORITY_RANK, value=TeamMappingDB.priority_threshold, else_=1))
+        )
+
+    @staticmethod
+    def _create_missing_indexes(sync_conn):
+        """Create model indexes missing from tables that predate them (create_all skips existing tables)"""
+        for table in (TeamMappingDB.__table__, TicketLogDB.__table__):
+            for index in table.indexes:
+                index.create(sync_conn, checkfirst=True)
+
     async def _insert_default_mappings(self):
         """Insert default team mappings for common departments"""
         default_mappings = [
@@ -127,9 +297,9 @@ class DatabaseManager:
 
         async with self.async_session() as session:
             try:
-                # Check if any mappings exist
-                result = await session.execute(select(TeamMappingDB).limit(1))
-                if result.first():
+                # Check if any mappings exist without hydrating a row
+                result = await session.execute(select(literal(1)).select_from(TeamMappingDB).limit(1))
+                if result.scalar() is not None:
                     return  # Mappings already exist
 
                 # Insert default mappings
@@ -141,69 +311,51 @@ class DatabaseManager:
                         api_method=mapping.api_method,
                         api_headers=mapping.api_headers,
                         priority_threshold=mapping.priority_threshold.value,
+                        priority_rank=PRIORITY_RANK[mapping.priority_threshold.value],
                         is_active=mapping.is_active
                     )
                     session.add(db_mapping)
 
                 await session.commit()
+                self.invalidate_team_cache()
             except Exception as e:
                 await session.rollback()
                 raise e
 
+    def invalidate_team_cache(self):
+        """Drop cached team mapping lookups (call after mapping writes)"""
+        self._mapping_cache.clear()
+
     async def get_team_mapping(self, department: DepartmentType, priority: TicketPriority = TicketPriority.LOW) -> \
     Optional[TeamMapping]:
         """
         Get team mapping for a department with priority filtering.
         Returns the most appropriate team based on priority threshold.
+        Results are cached per (department, priority) for a short TTL.
         """
+        cache_key = (department.value, priority.value)
+        cached = self._mapping_cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < self._cache_ttl:
+            return cached[1]
+
         async with self.async_session() as session:
             try:
-                # Query for active mappings for the department
-                query = select(TeamMappingDB).where(
-                    TeamMappingDB.department == department.value,
-                    TeamMappingDB.is_active == True
-                ).order_by(TeamMappingDB.priority_threshold.desc())
+                # Best match is the highest threshold the ticket priority still satisfies
+                params = {"department": department.value, "priority_rank": PRIORITY_RANK.get(priority.value, 1)}
+                mapping = (await session.execute(BEST_TEAM_MAPPING_STMT, params)).scalar_one_or_none()
 
-                result = await session.execute(query)
-                mappings = result.scalars().all()
+                if mapping is None:
+                    # No threshold satisfied: fall back to the lowest-threshold mapping
+                    result = await session.execute(FALLBACK_TEAM_MAPPING_STMT, {"department": department.value})
+                    mapping = result.scalar_one_or_none()
 
-                if not mappings:
+                if mapping is None:
                     return None
 
-                # Find the best match based on priority
-                priority_values = {"low": 1, "medium": 2, "high": 3, "critical": 4}
-                ticket_priority_value = priority_values.get(priority.value, 1)
-
-                for mapping in mappings:
-                    mapping_priority_value = priority_values.get(mapping.priority_threshold, 1)
-                    if ticket_priority_value >= mapping_priority_value:
-                        return TeamMapping(
-                            id=mapping.id,
-                            department=DepartmentType(mapping.department),
-                            team_name=mapping.team_name,
-                            api_endpoint=mapping.api_endpoint,
-                            api_method=mapping.api_method,
-                            api_headers=mapping.api_headers or {},
-                            priority_threshold=TicketPriority(mapping.priority_threshold),
-                            is_active=mapping.is_active,
-                            created_at=mapping.created_at,
-                            updated_at=mapping.updated_at
-                        )
-
-                # Return the first mapping if no priority match
-                mapping = mappings[0]
-                return TeamMapping(
-                    id=mapping.id,
-                    department=DepartmentType(mapping.department),
-                    team_name=mapping.team_name,
-                    api_endpoint=mapping.api_endpoint,
-                    api_method=mapping.api_method,
-                    api_headers=mapping.api_headers or {},
-                    priority_threshold=TicketPriority(mapping.priority_threshold),
-                    is_active=mapping.is_active,
-                    created_at=mapping.created_at,
-                    updated_at=mapping.updated_at
-                )
+                team_mapping = _row_to_mapping(mapping)
+
+                self._mapping_cache[cache_key] = (time.monotonic(), team_mapping)
+                return team_mapping
 
             except Exception as e:
                 raise Exception(f"Database error getting team mapping: {str(e)}")
@@ -212,110 +364,136 @@ class DatabaseManager:
         """Get all active team mappings"""
         async with self.async_session() as session:
             try:
-                query = select(TeamMappingDB).where(TeamMappingDB.is_active == True)
-                result = await session.execute(query)
-                mappings = result.scalars().all()
-
-                return [
-                    TeamMapping(
-                        id=mapping.id,
-                        department=DepartmentType(mapping.department),
-                        team_name=mapping.team_name,
-                        api_endpoint=mapping.api_endpoint,
-                        api_method=mapping.api_method,
-                        api_headers=mapping.api_headers or {},
-                        priority_threshold=TicketPriority(mapping.priority_threshold),
-                        is_active=mapping.is_active,
-                        created_at=mapping.created_at,
-                        updated_at=mapping.updated_at
-                    )
-                    for mapping in mappings
-                ]
+                # Select plain column rows to skip ORM identity-map hydration
+                result = await session.execute(ACTIVE_TEAM_MAPPINGS_STMT)
+
+                return [_row_to_mapping(row) for row in result]
             except Exception as e:
                 raise Exception(f"Database error getting all team mappings: {str(e)}")
 
-    async def log_ticket(self, ticket: ProcessedTicket):
-        """Log processed ticket to database for auditing and metrics"""
+    @staticmethod
+    def _ticket_log_values(ticket: ProcessedTicket) -> Dict[str, Any]:
+        """Build ticket_logs column values for a processed ticket"""
+        return {
+            "ticket_id": ticket.ticket_id,
+            "title": ticket.title,
+            "description": ticket.description,
+            "email": ticket.email,
+            "priority": ticket.priority.value,
+            "department": ticket.department.value if ticket.department else None,
+            "assigned_to": ticket.assigned_to,
+            "status": ticket.status.value,
+            "confidence_score": str(ticket.confidence_score) if ticket.confidence_score else None,
+            "external_ticket_id": ticket.external_ticket_id,
+            "routed_to_system": ticket.routed_to_system,
+            "ticket_metadata": ticket.metadata,
+            "error_message": ticket.routing_error
+        }
+
+    async def _write_ticket_logs(self, tickets: List[ProcessedTicket]):
+        """Upsert a batch of tickets in a single transaction"""
+        # Keep only the latest state per ticket; one statement cannot upsert the same row twice
+        rows = list({ticket.ticket_id: self._ticket_log_values(ticket) for ticket in tickets}.values())
+
         async with self.async_session() as session:
             try:
-                # Check if ticket already exists
-                query = select(TicketLogDB).where(TicketLogDB.ticket_id == ticket.ticket_id)
-                result = await session.execute(query)
-                existing = result.scalar_one_or_none()
-
-                if existing:
-                    # Update existing ticket
-                    await session.execute(
-                        update(TicketLogDB)
-                        .where(TicketLogDB.ticket_id == ticket.ticket_id)
-                        .values(
-                            department=ticket.department.value if ticket.department else None,
-                            assigned_to=ticket.assigned_to,
-                            status=ticket.status.value,
-                            confidence_score=str(ticket.confidence_score) if ticket.confidence_score else None,
-                            external_ticket_id=ticket.external_ticket_id,
-                            routed_to_system=ticket.routed_to_system,
-                            error_message=ticket.routing_error,
-                            updated_at=datetime.utcnow()
-                        )
-                    )
-                else:
-                    # Insert new ticket
-                    ticket_log = TicketLogDB(
-                        ticket_id=ticket.ticket_id,
-                        title=ticket.title,
-                        description=ticket.description,
-                        email=ticket.email,
-                        priority=ticket.priority.value,
-                        department=ticket.department.value if ticket.department else None,
-                        assigned_to=ticket.assigned_to,
-                        status=ticket.status.value,
-                        confidence_score=str(ticket.confidence_score) if ticket.confidence_score else None,
-                        external_ticket_id=ticket.external_ticket_id,
-                        routed_to_system=ticket.routed_to_system,
-                        metadata=ticket.metadata,
-                        error_message=ticket.routing_error
-                    )
-                    session.add(ticket_log)
-
+                await session.execute(self._ticket_log_upsert, rows)
                 await session.commit()
 
             except Exception as e:
                 await session.rollback()
                 raise Exception(f"Database error logging ticket: {str(e)}")
 
+    async def _flush_loop(self):
+        """Background task draining queued ticket logs in batches"""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._log_queue.get()]
+            deadline = loop.time() + self._flush_interval
+
+            # Collect until the batch is full or the flush interval elapses
+            while len(batch) < self._flush_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._log_queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._flush_batch(batch)
+            finally:
+                for _ in batch:
+                    self._log_queue.task_done()
+
+    async def _flush_batch(self, batch: List[ProcessedTicket]):
+        """
+        Write a batch of ticket logs without raising. A failed batch is retried once
+        (e.g. "database is locked" or a dropped connection), then written row by row
+        so only rows that still fail are lost; those are logged and counted.
+        """
+        for attempt in range(2):
+            try:
+                await self._write_ticket_logs(batch)
+                return
+            except Exception as e:
+                logger.warning("Failed to flush ticket logs", batch_size=len(batch), attempt=attempt + 1, error=str(e))
+                if attempt == 0:
+                    await asyncio.sleep(self._flush_interval)
+
+        if len(batch) == 1:
+            TICKET_LOGS_DROPPED.inc()
+            logger.error("Dropped ticket log", ticket_id=batch[0].ticket_id)
+            return
+
+        for ticket in batch:
+            try:
+                await self._write_ticket_logs([ticket])
+            except Exception as e:
+                TICKET_LOGS_DROPPED.inc()
+                logger.error("Dropped ticket log", ticket_id=ticket.ticket_id, error=str(e))
+
+    async def log_ticket(self, ticket: ProcessedTicket):
+        """
+        Log processed ticket to database for auditing and metrics.
+        Tickets are queued and written in batches by the background flusher;
+        writes happen inline when the flusher is not running or the queue is full.
+        Never raises: rows that cannot be written are logged and counted in
+        TICKET_LOGS_DROPPED.
+        """
+        if self._flusher is not None and not self._flusher.done():
+            try:
+                self._log_queue.put_nowait(ticket)
+                return
+            except asyncio.QueueFull:
+                pass
+
+        await self._flush_batch([ticket])
+
+    async def flush_ticket_logs(self):
+        """Wait until all queued ticket logs have been written"""
+        if self._flusher is not None and not self._flusher.done():
+            await self._log_queue.join()
+
     async def get_metrics(self) -> Dict[str, Any]:
         """Get processing metrics for monitoring dashboard"""
         async with self.async_session() as session:
             try:
-                # Total tickets processed - Fixed approach
-                total_result = await session.execute(
-                    select(func.count(TicketLogDB.id))
-                )
-                total_tickets = total_result.scalar() or 0
+                # Totals, routed counts and department distribution in a single grouped scan
+                result = await session.execute(TICKET_METRICS_STMT)
 
-                # Success rate (tickets that were successfully routed)
-                success_result = await session.execute(
-                    select(func.count(TicketLogDB.id))
-                    .where(TicketLogDB.status == "routed")
-                )
-                successful_tickets = success_result.scalar() or 0
-                success_rate = (successful_tickets / total_tickets * 100) if total_tickets > 0 else 0
-
-                # Department distribution - FIXED VERSION
-                dept_result = await session.execute(
-                    select(
-                        TicketLogDB.department,
-                        func.count(TicketLogDB.id).label('count')
-                    ).group_by(TicketLogDB.department)
-                )
-
-                # Proper way to access the results
+                total_tickets = 0
+                successful_tickets = 0
                 department_distribution = {}
-                for row in dept_result:
-                    dept_name = row.department or "unknown"
-                    count = row.count  # This now works correctly with func.count()
-                    department_distribution[dept_name] = count
+                for row in result:
+                    total_tickets += row.total
+                    successful_tickets += row.success or 0
+                    department_distribution[row.department or "unknown"] = row.total
+
+                # Success rate (tickets that were successfully routed)
+                success_rate = (successful_tickets / total_tickets * 100) if total_tickets > 0 else 0.0
 
                 return {
                     "total_tickets_processed": total_tickets,
@@ -327,8 +505,22 @@ class DatabaseManager:
             except Exception as e:
                 raise Exception(f"Database error getting metrics: {str(e)}")
 
+    async def ping(self):
+        """Lightweight connectivity check for health probes"""
+        async with self.async_session() as session:
+            await session.execute(text("SELECT 1"))
+
     async def close(self):
-        """Close database connections"""
+        """Flush pending ticket logs and close database connections"""
+        if self._flusher is not None:
+            await self.flush_ticket_logs()
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+
         await self.engine.dispose()
 
 
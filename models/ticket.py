@@ -3,11 +3,11 @@ Ticket and team mapping data models using dataclasses for minimal boilerplate.
 Includes validation and serialization methods for API compatibility.
 """
 
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 from typing import Optional, Dict, Any, List
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class TicketPriority(str, Enum):
@@ -37,7 +37,7 @@ class DepartmentType(str, Enum):
     GENERAL = "GENERAL"
 
 
-@dataclass
+@dataclass(slots=True)
 class IncomingTicket:
     """
     Raw ticket data received from external systems (n8n webhook).
@@ -59,7 +59,7 @@ class IncomingTicket:
             raise ValueError("Email cannot be empty")
 
 
-@dataclass
+@dataclass(slots=True)
 class ProcessedTicket:
     """
     Ticket after classification and enrichment.
@@ -88,17 +88,36 @@ class ProcessedTicket:
     external_ticket_id: Optional[str] = None
     routing_error: Optional[str] = None
 
+    # Epoch seconds of created_at, stored when the factories already have it
+    created_at_epoch: Optional[int] = None
+
     def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary for JSON serialization"""
-        result = asdict(self)
-        # Convert datetime to ISO format
-        if isinstance(result.get('created_at'), datetime):
-            result['created_at'] = result['created_at'].isoformat()
-        return result
+        """Convert to dictionary for JSON serialization (shallow, no dataclass recursion)"""
+        return {
+            "title": self.title,
+            "description": self.description,
+            "email": self.email,
+            "priority": self.priority.value,
+            "metadata": self.metadata,
+            "ticket_id": self.ticket_id,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "status": self.status.value,
+            "department": self.department.value if self.department else None,
+            "assigned_to": self.assigned_to,
+            "confidence_score": self.confidence_score,
+            "classification_reasoning": self.classification_reasoning,
+            "routed_to_system": self.routed_to_system,
+            "external_ticket_id": self.external_ticket_id,
+            "routing_error": self.routing_error
+        }
 
     @classmethod
-    def from_incoming(cls, incoming: IncomingTicket, ticket_id: str) -> 'ProcessedTicket':
-        """Create ProcessedTicket from IncomingTicket"""
+    def from_incoming(cls, incoming: IncomingTicket, ticket_id: str,
+                      received_at: Optional[float] = None) -> 'ProcessedTicket':
+        """
+        Create ProcessedTicket from IncomingTicket.
+        Pass received_at (epoch seconds) to reuse a timestamp the caller already took.
+        """
         return cls(
             title=incoming.title,
             description=incoming.description,
@@ -106,11 +125,30 @@ class ProcessedTicket:
             priority=incoming.priority,
             metadata=incoming.metadata,
             ticket_id=ticket_id,
-            created_at=datetime.utcnow()
+            created_at=datetime.utcfromtimestamp(received_at) if received_at is not None else datetime.utcnow(),
+            created_at_epoch=int(received_at) if received_at is not None else None
         )
 
+    @classmethod
+    def from_request(cls, request: 'TicketCreateRequest', ticket_id: str,
+                     received_at: Optional[float] = None) -> 'ProcessedTicket':
+        """
+        Create ProcessedTicket straight from a validated TicketCreateRequest.
+        Skips the IncomingTicket step; the request model already enforces its checks.
+        """
+        return cls(
+            title=request.title,
+            description=request.description,
+            email=request.email,
+            priority=request.priority,
+            metadata=request.metadata,
+            ticket_id=ticket_id,
+            created_at=datetime.utcfromtimestamp(received_at) if received_at is not None else datetime.utcnow(),
+            created_at_epoch=int(received_at) if received_at is not None else None
+        )
 
-@dataclass
+
+@dataclass(slots=True)
 class TeamMapping:
     """
     Database model for team routing configuration.
@@ -128,13 +166,19 @@ class TeamMapping:
     updated_at: Optional[datetime] = None
 
     def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary for database operations"""
-        result = asdict(self)
-        # Handle datetime serialization
-        for field_name in ['created_at', 'updated_at']:
-            if result.get(field_name) and isinstance(result[field_name], datetime):
-                result[field_name] = result[field_name].isoformat()
-        return result
+        """Convert to dictionary for database operations (shallow, no dataclass recursion)"""
+        return {
+            "id": self.id,
+            "department": self.department.value,
+            "team_name": self.team_name,
+            "api_endpoint": self.api_endpoint,
+            "api_method": self.api_method,
+            "api_headers": self.api_headers,
+            "priority_threshold": self.priority_threshold.value,
+            "is_active": self.is_active,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+        }
 
 
 @dataclass
@@ -148,7 +192,7 @@ class ClassificationResult:
     confidence_score: float
     reasoning: str
     processing_time_ms: int
-    model_version: str = "gemini-1.5-pro"
+    model_version: str = "gemini-1.5-flash"
 
     def is_confident(self, threshold: float = 0.8) -> bool:
         """Check if classification confidence meets threshold"""
@@ -173,9 +217,14 @@ class RoutingResult:
 # Pydantic models for API validation and OpenAPI spec generation
 class TicketCreateRequest(BaseModel):
     """API request model for creating tickets"""
-    title: str = Field(..., min_length=1, max_length=200, description="Ticket title")
-    description: str = Field(..., min_length=1, max_length=5000, description="Detailed description")
-    email: EmailStr = Field(..., description="Reporter email address")
+    model_config = ConfigDict(extra="ignore", validate_assignment=False)
+
+    # pattern rejects whitespace-only values, matching IncomingTicket's checks
+    title: str = Field(..., min_length=1, max_length=200, pattern=r"\S", description="Ticket title")
+    description: str = Field(..., min_length=1, max_length=5000, pattern=r"\S", description="Detailed description")
+    # Shape check only; pydantic-core compiles and runs the pattern natively
+    email: str = Field(..., max_length=254, pattern=r"^[^@\s]+@[^@\s]+\.[^@\s]+$",
+                       description="Reporter email address")
     priority: TicketPriority = Field(default=TicketPriority.MEDIUM, description="Ticket priority")
     metadata: Dict[str, Any] = Field(default_factory=dict, description="Additional metadata")
 
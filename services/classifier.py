@@ -4,16 +4,22 @@ Implements few-shot learning with production-ready error handling and caching.
 """
 
 import os
+import math
 import time
 import json
-from typing import Optional, Dict, Any, List
+import asyncio
+import operator
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Union, Tuple
 from dataclasses import asdict
 
 import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
+from google.api_core.exceptions import ResourceExhausted, ServiceUnavailable, DeadlineExceeded
 
 from models.ticket import (
     IncomingTicket,
+    ProcessedTicket,
     ClassificationResult,
     DepartmentType,
     TicketPriority
@@ -23,6 +29,86 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Gemini errors worth retrying (quota, overload, timeout); anything else goes straight to the fallback
+TRANSIENT_GEMINI_ERRORS = (ResourceExhausted, ServiceUnavailable, DeadlineExceeded)
+
+# Shared decoder for classification responses
+_JSON_DECODER = json.JSONDecoder()
+
+# Worked examples for the few-shot classification prompt
+FEW_SHOT_EXAMPLES: Tuple[Dict[str, str], ...] = (
+    {
+        "title": "VPN connection issues after Windows update",
+        "description": "Cannot connect to company VPN after latest Windows update. Getting timeout errors.",
+        "department": "IT",
+        "team": "network_team",
+        "reasoning": "Network connectivity issue requiring IT support for VPN troubleshooting."
+    },
+    {
+        "title": "New employee onboarding documents",
+        "description": "Need to complete I-9 forms and benefits enrollment for new hire starting Monday.",
+        "department": "HR",
+        "team": "hr_operations",
+        "reasoning": "Employee onboarding and documentation handled by HR operations."
+    },
+    {
+        "title": "Conference room booking system not working",
+        "description": "Meeting room reservation system is down, cannot book rooms for client meetings.",
+        "department": "FACILITIES",
+        "team": "facilities_management",
+        "reasoning": "Office systems and meeting room management falls under facilities."
+    },
+    {
+        "title": "Expense report approval delayed",
+        "description": "Submitted expense report 2 weeks ago but still pending approval in the system.",
+        "department": "FINANCE",
+        "team": "finance_team",
+        "reasoning": "Expense management and approval processes are handled by finance."
+    },
+    {
+        "title": "Data privacy compliance question",
+        "description": "Need guidance on GDPR compliance for customer data collection in new product.",
+        "department": "LEGAL",
+        "team": "compliance_team",
+        "reasoning": "Privacy compliance and legal guidance required from legal team."
+    },
+    {
+        "title": "Suspicious email with potential malware",
+        "description": "Received suspicious email with attachment, may be phishing attempt.",
+        "department": "SECURITY",
+        "team": "infosec_team",
+        "reasoning": "Security incident requiring immediate attention from information security."
+    }
+)
+
+# API key the genai clients are currently configured with
+_configured_api_key: Optional[str] = None
+
+
+def _configure_genai(api_key: str):
+    """
+    Configure the Gemini SDK once per API key.
+    genai.configure() discards the SDK's cached clients, so repeating it would drop the
+    shared gRPC channel that concurrent classifications multiplex over.
+    """
+    global _configured_api_key
+    if api_key != _configured_api_key:
+        genai.configure(api_key=api_key)
+        _configured_api_key = api_key
+
+
+# Keyword-based classification rules for the fallback path (order breaks score ties)
+FALLBACK_KEYWORDS: Dict[DepartmentType, Tuple[str, ...]] = {
+    DepartmentType.IT: ('vpn', 'computer', 'laptop', 'password', 'email', 'network', 'wifi', 'software', 'login',
+                        'system'),
+    DepartmentType.HR: ('benefits', 'payroll', 'vacation', 'pto', 'onboarding', 'training', 'employment', 'hiring'),
+    DepartmentType.FACILITIES: ('office', 'room', 'building', 'parking', 'heating', 'cooling', 'maintenance',
+                                'cleaning'),
+    DepartmentType.SECURITY: ('phishing', 'malware', 'suspicious', 'breach', 'access', 'badge', 'security'),
+    DepartmentType.FINANCE: ('expense', 'invoice', 'payment', 'budget', 'procurement', 'vendor', 'reimbursement'),
+    DepartmentType.LEGAL: ('contract', 'compliance', 'gdpr', 'privacy', 'legal', 'lawsuit', 'regulation'),
+}
+
 
 class TicketClassifier:
     """
@@ -36,15 +122,20 @@ class TicketClassifier:
     - Performance monitoring and caching
     """
 
-    def __init__(self, api_key: str = None, model_name: str = "gemini-1.5-pro"):
+    def __init__(self, api_key: str = None, model_name: str = "gemini-1.5-flash", max_concurrency: int = 20,
+                 embedding_model: str = "models/embedding-001", cache_max: int = 10_000,
+                 cache_ttl: float = 86400.0):
         self.api_key = api_key or os.getenv("GOOGLE_API_KEY")
         self.model_name = model_name
 
+        # Caps concurrent Gemini requests to stay within the API quota
+        self._request_slots = asyncio.Semaphore(max_concurrency)
+
         if not self.api_key:
             raise ValueError("Google API key is required for classification service")
 
-        # Configure Gemini client
-        genai.configure(api_key=self.api_key)
+        # Configure Gemini client (shared process-wide)
+        _configure_genai(self.api_key)
 
         # Initialize model with safety settings
         self.model = genai.GenerativeModel(
@@ -57,8 +148,18 @@ class TicketClassifier:
             }
         )
 
-        # Classification cache for similar tickets (in-memory for demo)
-        self._classification_cache: Dict[str, ClassificationResult] = {}
+        # Classification cache for similar tickets (in-memory LRU with TTL, least recently used first)
+        self.cache_max = cache_max
+        self.cache_ttl = cache_ttl
+        self._classification_cache: Dict[str, Tuple[float, ClassificationResult]] = OrderedDict()
+
+        # Semantic cache (second tier): (stored_at, unit-length embedding, result), oldest first;
+        # entries expire after cache_ttl like the exact-match cache
+        self.embedding_model = embedding_model
+        self.semantic_cache_enabled = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+        self.semantic_threshold = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+        self.semantic_cache_size = int(os.getenv("SEMANTIC_CACHE_SIZE", "512"))
+        self._semantic_entries: List[Tuple[float, List[float], ClassificationResult]] = []
 
         # Department-specific team mappings
         self.team_mappings = {
@@ -85,58 +186,19 @@ class TicketClassifier:
             ]
         }
 
-    def _build_classification_prompt(self, ticket: IncomingTicket) -> str:
+        # Set view of team_mappings for membership checks (lists keep the default-team order)
+        self._team_sets = {dept: frozenset(teams) for dept, teams in self.team_mappings.items()}
+
+        # Few-shot prefix is identical for every ticket
+        self._prompt_prefix = self._build_prompt_prefix()
+
+    def _build_prompt_prefix(self) -> str:
         """
-        Build few-shot learning prompt with domain-specific examples.
-        Uses structured examples to improve classification accuracy.
+        Build the constant few-shot prefix (instructions plus domain-specific examples).
+        Computed once in __init__; structured examples improve classification accuracy.
         """
-        examples = [
-            {
-                "title": "VPN connection issues after Windows update",
-                "description": "Cannot connect to company VPN after latest Windows update. Getting timeout errors.",
-                "department": "IT",
-                "team": "network_team",
-                "reasoning": "Network connectivity issue requiring IT support for VPN troubleshooting."
-            },
-            {
-                "title": "New employee onboarding documents",
-                "description": "Need to complete I-9 forms and benefits enrollment for new hire starting Monday.",
-                "department": "HR",
-                "team": "hr_operations",
-                "reasoning": "Employee onboarding and documentation handled by HR operations."
-            },
-            {
-                "title": "Conference room booking system not working",
-                "description": "Meeting room reservation system is down, cannot book rooms for client meetings.",
-                "department": "FACILITIES",
-                "team": "facilities_management",
-                "reasoning": "Office systems and meeting room management falls under facilities."
-            },
-            {
-                "title": "Expense report approval delayed",
-                "description": "Submitted expense report 2 weeks ago but still pending approval in the system.",
-                "department": "FINANCE",
-                "team": "finance_team",
-                "reasoning": "Expense management and approval processes are handled by finance."
-            },
-            {
-                "title": "Data privacy compliance question",
-                "description": "Need guidance on GDPR compliance for customer data collection in new product.",
-                "department": "LEGAL",
-                "team": "compliance_team",
-                "reasoning": "Privacy compliance and legal guidance required from legal team."
-            },
-            {
-                "title": "Suspicious email with potential malware",
-                "description": "Received suspicious email with attachment, may be phishing attempt.",
-                "department": "SECURITY",
-                "team": "infosec_team",
-                "reasoning": "Security incident requiring immediate attention from information security."
-            }
-        ]
-
-        # Build the prompt with examples and ticket data
-        prompt = """You are an expert IT ticket classifier for a corporate environment. 
+        # Build the prompt header and examples
+        parts = ["""You are an expert IT ticket classifier for a corporate environment. 
 
 Your task is to classify incoming tickets into the appropriate department and assign them to the most suitable team.
 
@@ -144,11 +206,11 @@ Available departments: IT, HR, FACILITIES, FINANCE, LEGAL, SECURITY, GENERAL
 
 Here are examples of correct classifications:
 
-"""
+"""]
 
         # Add examples
-        for i, example in enumerate(examples, 1):
-            prompt += f"""Example {i}:
+        for i, example in enumerate(FEW_SHOT_EXAMPLES, 1):
+            parts.append(f"""Example {i}:
 Title: {example['title']}
 Description: {example['description']}
 Classification:
@@ -156,10 +218,13 @@ Classification:
 - Team: {example['team']}
 - Reasoning: {example['reasoning']}
 
-"""
+""")
 
-        # Add the ticket to classify
-        prompt += f"""Now classify this ticket:
+        return "".join(parts)
+
+    def _build_classification_prompt(self, ticket: IncomingTicket) -> str:
+        """Append the ticket to classify to the precomputed few-shot prefix"""
+        return self._prompt_prefix + f"""Now classify this ticket:
 
 Title: {ticket.title}
 Description: {ticket.description}
@@ -183,15 +248,92 @@ Important guidelines:
 
 Classification:"""
 
-        return prompt
-
     def _generate_cache_key(self, ticket: IncomingTicket) -> str:
         """Generate cache key for ticket classification"""
         # Use title and description for similarity matching
-        content = f"{ticket.title.lower()} {ticket.description.lower()}"
+        content = f"{ticket.title} {ticket.description}".lower()
         # Simple hash for demo - in production, use semantic similarity
         return str(hash(content))
 
+    def _cache_get(self, cache_key: str) -> Optional[ClassificationResult]:
+        """Return a fresh cached classification and mark it recently used"""
+        entry = self._classification_cache.get(cache_key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] >= self.cache_ttl:
+            del self._classification_cache[cache_key]
+            return None
+        self._classification_cache.move_to_end(cache_key)
+        return entry[1]
+
+    def _cache_put(self, cache_key: str, result: ClassificationResult, stored_at: Optional[float] = None):
+        """
+        Store a classification, evicting the least recently used entry when full.
+        Pass stored_at to keep the age of a result copied from another cache tier.
+        """
+        self._classification_cache[cache_key] = (time.monotonic() if stored_at is None else stored_at, result)
+        self._classification_cache.move_to_end(cache_key)
+        if len(self._classification_cache) > self.cache_max:
+            self._classification_cache.popitem(last=False)
+
+    async def _semantic_match(self, ticket: IncomingTicket
+                              ) -> Tuple[Optional[List[float]], Optional[Tuple[float, ClassificationResult]]]:
+        """Embed the ticket and search the semantic cache in one worker-thread call, off the event loop"""
+        # Snapshot the cache so the worker never sees it mid-eviction
+        return await asyncio.to_thread(
+            self._embed_and_lookup,
+            f"{ticket.title}\n{ticket.description}",
+            list(self._semantic_entries)
+        )
+
+    def _embed_and_lookup(self, content: str, entries: List[Tuple[float, List[float], ClassificationResult]]
+                          ) -> Tuple[Optional[List[float]], Optional[Tuple[float, ClassificationResult]]]:
+        """
+        Embed content as a unit vector and find the closest fresh cached entry (blocking).
+        Returns the vector and (stored_at, result) of the match; (None, None) if embedding fails.
+        """
+        try:
+            response = genai.embed_content(
+                model=self.embedding_model,
+                content=content,
+                task_type="semantic_similarity"
+            )
+        except Exception:
+            return None, None
+
+        vector = response["embedding"]
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        vector = [v / norm for v in vector]
+        return vector, self._semantic_lookup(vector, entries)
+
+    def _semantic_lookup(self, vector: List[float], entries: List[Tuple[float, List[float], ClassificationResult]]
+                         ) -> Optional[Tuple[float, ClassificationResult]]:
+        """Return (stored_at, result) of the unexpired entry most similar to vector if it clears the threshold"""
+        oldest_fresh = time.monotonic() - self.cache_ttl
+        best_score, best_match = self.semantic_threshold, None
+        for stored_at, cached_vector, result in entries:
+            if stored_at <= oldest_fresh:
+                continue
+            # Cosine similarity reduces to a dot product for unit vectors
+            score = sum(map(operator.mul, vector, cached_vector))
+            if score >= best_score:
+                best_score, best_match = score, (stored_at, result)
+        return best_match
+
+    def _semantic_store(self, vector: List[float], result: ClassificationResult):
+        """Add a classification to the semantic cache, evicting expired entries and the oldest one when full"""
+        # Entries are in insertion order, so expired ones form a prefix
+        oldest_fresh = time.monotonic() - self.cache_ttl
+        expired = 0
+        while expired < len(self._semantic_entries) and self._semantic_entries[expired][0] <= oldest_fresh:
+            expired += 1
+        if expired:
+            del self._semantic_entries[:expired]
+
+        if len(self._semantic_entries) >= self.semantic_cache_size:
+            del self._semantic_entries[0]
+        self._semantic_entries.append((time.monotonic(), vector, result))
+
     def _parse_classification_response(self, response_text: str, ticket_logger: TicketLogger) -> Optional[
         Dict[str, Any]]:
         """
@@ -200,18 +342,14 @@ Classification:"""
         """
         try:
             # Extract JSON from response (handle various formats)
-            response_text = response_text.strip()
-
-            # Find JSON content between curly braces
             start_idx = response_text.find('{')
-            end_idx = response_text.rfind('}') + 1
 
-            if start_idx == -1 or end_idx == 0:
-                ticket_logger.warning("No JSON found in classification response", response=response_text[:200])
+            if start_idx == -1:
+                ticket_logger.warning("No JSON found in classification response", response=response_text.strip()[:200])
                 return None
 
-            json_content = response_text[start_idx:end_idx]
-            result = json.loads(json_content)
+            # Decode the object in place; text after its closing brace is ignored
+            result, _ = _JSON_DECODER.raw_decode(response_text, start_idx)
 
             # Validate required fields
             required_fields = ['department', 'team', 'confidence', 'reasoning']
@@ -237,11 +375,10 @@ Classification:"""
             result['confidence'] = confidence
 
             # Validate team assignment
-            if result['department'] in self.team_mappings:
-                available_teams = self.team_mappings[result['department']]
-                if result['team'] not in available_teams:
+            if result['department'] in self._team_sets:
+                if result['team'] not in self._team_sets[result['department']]:
                     # Assign default team for department
-                    result['team'] = available_teams[0]
+                    result['team'] = self.team_mappings[result['department']][0]
                     ticket_logger.info(f"Assigned default team for department: {result['team']}")
 
             return result
@@ -258,27 +395,12 @@ Classification:"""
         Create fallback classification when AI classification fails.
         Uses keyword-based rules as backup classification method.
         """
-        title_lower = ticket.title.lower()
-        desc_lower = ticket.description.lower()
-        combined_text = f"{title_lower} {desc_lower}"
-
-        # Keyword-based classification rules
-        it_keywords = ['vpn', 'computer', 'laptop', 'password', 'email', 'network', 'wifi', 'software', 'login',
-                       'system']
-        hr_keywords = ['benefits', 'payroll', 'vacation', 'pto', 'onboarding', 'training', 'employment', 'hiring']
-        facilities_keywords = ['office', 'room', 'building', 'parking', 'heating', 'cooling', 'maintenance', 'cleaning']
-        security_keywords = ['phishing', 'malware', 'suspicious', 'breach', 'access', 'badge', 'security']
-        finance_keywords = ['expense', 'invoice', 'payment', 'budget', 'procurement', 'vendor', 'reimbursement']
-        legal_keywords = ['contract', 'compliance', 'gdpr', 'privacy', 'legal', 'lawsuit', 'regulation']
+        combined_text = f"{ticket.title} {ticket.description}".lower()
 
         # Score each department based on keyword matches
         scores = {
-            DepartmentType.IT: sum(1 for kw in it_keywords if kw in combined_text),
-            DepartmentType.HR: sum(1 for kw in hr_keywords if kw in combined_text),
-            DepartmentType.FACILITIES: sum(1 for kw in facilities_keywords if kw in combined_text),
-            DepartmentType.SECURITY: sum(1 for kw in security_keywords if kw in combined_text),
-            DepartmentType.FINANCE: sum(1 for kw in finance_keywords if kw in combined_text),
-            DepartmentType.LEGAL: sum(1 for kw in legal_keywords if kw in combined_text),
+            department: sum(1 for kw in keywords if kw in combined_text)
+            for department, keywords in FALLBACK_KEYWORDS.items()
         }
 
         # Find department with highest score
@@ -306,14 +428,27 @@ Classification:"""
             model_version="fallback-keywords"
         )
 
+    @retry_with_backoff(max_attempts=5, exceptions=TRANSIENT_GEMINI_ERRORS)
+    async def _generate(self, prompt: str):
+        """Send a prompt to Gemini's async client, retrying transient API errors"""
+        async with self._request_slots:
+            return await self.model.generate_content_async(
+                prompt,
+                generation_config=genai.types.GenerationConfig(
+                    temperature=0.1,  # Low temperature for consistent results
+                    top_p=0.9,
+                    top_k=40,
+                    max_output_tokens=256,  # Classification JSON is ~80 tokens
+                )
+            )
+
     @timing_decorator("ticket_classification")
-    @retry_with_backoff(max_attempts=3, exceptions=(Exception,))
-    async def classify_ticket(self, ticket: IncomingTicket) -> ClassificationResult:
+    async def classify_ticket(self, ticket: Union[IncomingTicket, ProcessedTicket]) -> ClassificationResult:
         """
         Classify ticket using Gemini AI with fallback logic.
 
         Args:
-            ticket: The incoming ticket to classify
+            ticket: The ticket to classify (only title, description, priority and email are read)
 
         Returns:
             ClassificationResult with department, team, and confidence
@@ -321,32 +456,38 @@ Classification:"""
         Raises:
             Exception: When all classification attempts fail
         """
-        ticket_logger = TicketLogger(f"classify_{hash(ticket.title)}")
+        # Log under the ticket's own id when it has one (ProcessedTicket)
+        ticket_logger = TicketLogger(getattr(ticket, "ticket_id", None) or "unassigned")
         start_time = time.time()
 
         try:
             # Check cache first
             cache_key = self._generate_cache_key(ticket)
-            if cache_key in self._classification_cache:
-                cached_result = self._classification_cache[cache_key]
+            cached_result = self._cache_get(cache_key)
+            if cached_result:
                 ticket_logger.info("Using cached classification", department=cached_result.department.value)
                 return cached_result
 
+            # Then the semantic cache, which also matches paraphrased tickets
+            vector = None
+            if self.semantic_cache_enabled:
+                async with self._request_slots:
+                    vector, similar_match = await self._semantic_match(ticket)
+                if similar_match:
+                    # Keep the original entry's age so the copy expires with it
+                    stored_at, similar_result = similar_match
+                    self._cache_put(cache_key, similar_result, stored_at)
+                    ticket_logger.info("Using semantically cached classification",
+                                       department=similar_result.department.value)
+                    return similar_result
+
             # Build classification prompt
             prompt = self._build_classification_prompt(ticket)
 
             ticket_logger.info("Sending classification request to Gemini")
 
             # Generate classification using Gemini
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.1,  # Low temperature for consistent results
-                    top_p=0.9,
-                    top_k=40,
-                    max_output_tokens=500,
-                )
-            )
+            response = await self._generate(prompt)
 
             if not response.text:
                 raise Exception("Empty response from Gemini API")
@@ -371,7 +512,9 @@ Classification:"""
             )
 
             # Cache successful classification
-            self._classification_cache[cache_key] = result
+            self._cache_put(cache_key, result)
+            if vector:
+                self._semantic_store(vector, result)
 
             ticket_logger.log_classification(
                 department=result.department.value,
@@ -391,11 +534,28 @@ Classification:"""
 
             return fallback_result
 
+    async def classify_tickets(self, tickets: List[Union[IncomingTicket, ProcessedTicket]]) -> List[ClassificationResult]:
+        """
+        Classify several tickets concurrently.
+        Requests are bounded by max_concurrency; results keep the input order and
+        any ticket whose classification raises gets the keyword fallback.
+        """
+        results = await asyncio.gather(
+            *(self.classify_ticket(ticket) for ticket in tickets),
+            return_exceptions=True
+        )
+
+        return [
+            result if isinstance(result, ClassificationResult) else self._create_fallback_classification(ticket)
+            for ticket, result in zip(tickets, results)
+        ]
+
     def get_classification_stats(self) -> Dict[str, Any]:
         """Get classification service statistics"""
         return {
             "model_name": self.model_name,
             "cache_size": len(self._classification_cache),
+            "semantic_cache_size": len(self._semantic_entries),
             "available_departments": [dept.value for dept in DepartmentType],
             "team_mappings": {
                 dept.value: teams for dept, teams in self.team_mappings.items()
@@ -404,4 +564,5 @@ Classification:"""
 
     def clear_cache(self):
         """Clear classification cache"""
-        self._classification_cache.clear()
\ No newline at end of file
+        self._classification_cache.clear()
+        self._semantic_entries.clear()
\ No newline at end of file
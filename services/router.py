@@ -6,7 +6,12 @@ Handles multiple destination systems (Jira, Freshservice, etc.) with resilient H
 import os
 import time
 import json
-from typing import Dict, Any, Optional, List
+import asyncio
+import functools
+import orjson
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Tuple
 from urllib.parse import urlparse
 
 import httpx
@@ -21,6 +26,161 @@ from models.ticket import (
 )
 from utils.logger import timing_decorator, retry_with_backoff, APICallLogger, TicketLogger
 
+# HTTP client configuration for production use
+HTTP_TIMEOUT = Timeout(
+    connect=10.0,  # Connection timeout
+    read=30.0,  # Read timeout
+    write=10.0,  # Write timeout
+    pool=5.0  # Pool timeout
+)
+
+HTTP_LIMITS = Limits(
+    max_keepalive_connections=20,
+    max_connections=100,
+    keepalive_expiry=75.0  # Match common upstream idle timeouts (nginx default 75s)
+)
+
+# Shorter limits for connectivity checks (10s overall, 5s to connect)
+TEST_ENDPOINT_TIMEOUT = Timeout(10.0, connect=5.0)
+
+# HTTP/2 lets concurrent requests to the same host share one connection (needs h2)
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+
+# Per-system priority/colour tables, built once instead of per ticket
+JIRA_PRIORITIES = {
+    TicketPriority.LOW: "Low",
+    TicketPriority.MEDIUM: "Medium",
+    TicketPriority.HIGH: "High",
+    TicketPriority.CRITICAL: "Highest"
+}
+
+FRESHSERVICE_PRIORITIES = {
+    TicketPriority.LOW: 1,
+    TicketPriority.MEDIUM: 2,
+    TicketPriority.HIGH: 3,
+    TicketPriority.CRITICAL: 4
+}
+
+SLACK_COLORS = {
+    TicketPriority.LOW: "#36a64f",  # Green
+    TicketPriority.MEDIUM: "#ff9500",  # Orange
+    TicketPriority.HIGH: "#ff0000",  # Red
+    TicketPriority.CRITICAL: "#800080"  # Purple
+}
+
+# Only generic targets may redirect; Jira/Freshservice/Slack APIs answer directly
+REDIRECT_SYSTEMS = frozenset({"webhook_test", "unknown"})
+
+# Statuses whose Retry-After header is honoured, and the longest wait we accept (seconds)
+RETRY_AFTER_STATUSES = frozenset({429, 503})
+MAX_RETRY_AFTER = 30.0
+
+# Routing POSTs create tickets, so only failures where the request cannot have been
+# processed (no connection made) or the server asks for a retry are repeated
+RETRYABLE_REQUEST_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+def _is_retryable(error: BaseException) -> bool:
+    """Whether a failed routing request is safe and worthwhile to send again"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status_code = error.response.status_code
+        return status_code == 429 or status_code >= 500
+    return isinstance(error, RETRYABLE_REQUEST_ERRORS)
+
+
+def _retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Delay requested by a 429/503 Retry-After header (seconds form only), capped at MAX_RETRY_AFTER"""
+    if not isinstance(error, httpx.HTTPStatusError) or error.response.status_code not in RETRY_AFTER_STATUSES:
+        return None
+    retry_after = error.response.headers.get("Retry-After")
+    if not retry_after:
+        return None
+    try:
+        return min(float(retry_after), MAX_RETRY_AFTER)
+    except ValueError:
+        return None  # HTTP-date form; fall back to the decorator's backoff
+
+
+# Bytes of an error response body kept in routing error messages
+ERROR_BODY_LIMIT = 512
+
+# Candidate ID fields for systems without a dedicated extractor
+GENERIC_ID_KEYS = ("id", "ticket_id", "key", "number")
+GENERIC_NESTED_KEYS = ("ticket", "issue", "data")
+
+
+def _jira_ticket_id(response_data: Dict[str, Any]) -> Optional[str]:
+    """Jira returns the issue key (preferred) and numeric id at the top level"""
+    return response_data.get("key") or response_data.get("id")
+
+
+def _freshservice_ticket_id(response_data: Dict[str, Any]) -> Optional[str]:
+    """Freshservice nests the created ticket under a ticket object"""
+    ticket_id = response_data.get("ticket", {}).get("id")
+    return str(ticket_id) if ticket_id else None
+
+
+def _slack_ticket_id(response_data: Dict[str, Any]) -> Optional[str]:
+    """Slack webhooks don't return ticket IDs"""
+    return f"slack_{int(time.time())}"
+
+
+def _generic_ticket_id(response_data: Dict[str, Any]) -> Optional[str]:
+    """Look for common ID fields at the top level, then in common nested objects"""
+    for key in GENERIC_ID_KEYS:
+        if key in response_data:
+            return str(response_data[key])
+
+    for nested_key in GENERIC_NESTED_KEYS:
+        nested_data = response_data.get(nested_key)
+        if isinstance(nested_data, dict):
+            for key in GENERIC_ID_KEYS:
+                if key in nested_data:
+                    return str(nested_data[key])
+
+    return None
+
+
+TICKET_ID_EXTRACTORS = {
+    "jira": _jira_ticket_id,
+    "freshservice": _freshservice_ticket_id,
+    "slack": _slack_ticket_id
+}
+
+# One pooled client per event loop, so TLS/TCP connections survive across requests
+_shared_clients: Dict[asyncio.AbstractEventLoop, AsyncClient] = {}
+
+
+def get_shared_client() -> AsyncClient:
+    """Return the process-wide HTTP client for the running event loop, creating it on first use"""
+    loop = asyncio.get_running_loop()
+    client = _shared_clients.get(loop)
+    if client is None or client.is_closed:
+        client = AsyncClient(
+            timeout=HTTP_TIMEOUT,
+            limits=HTTP_LIMITS,
+            http2=HTTP2_ENABLED,
+            follow_redirects=False,  # Opted into per request, see REDIRECT_SYSTEMS
+            verify=True  # SSL verification enabled
+        )
+        _shared_clients[loop] = client
+    return client
+
+
+async def close_shared_client():
+    """Close the shared HTTP client for the running event loop (called once on shutdown)"""
+    client = _shared_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+@dataclass(slots=True)
+class _CircuitBreakerState:
+    """Per-endpoint circuit breaker state (times from time.monotonic)"""
+    failures: int = 0
+    last_failure_at: float = 0.0
+    open: bool = False
+
 
 class TicketRouter:
     """
@@ -35,28 +195,12 @@ class TicketRouter:
     - Rate limiting and circuit breaker patterns
     """
 
-    def __init__(self):
-        # HTTP client configuration for production use
-        self.timeout = Timeout(
-            connect=10.0,  # Connection timeout
-            read=30.0,  # Read timeout
-            write=10.0,  # Write timeout
-            pool=5.0  # Pool timeout
-        )
-
-        self.limits = Limits(
-            max_keepalive_connections=20,
-            max_connections=100,
-            keepalive_expiry=30.0
-        )
+    def __init__(self, client: Optional[AsyncClient] = None):
+        self.timeout = HTTP_TIMEOUT
+        self.limits = HTTP_LIMITS
 
-        # Initialize async HTTP client
-        self.client = AsyncClient(
-            timeout=self.timeout,
-            limits=self.limits,
-            follow_redirects=True,
-            verify=True  # SSL verification enabled
-        )
+        # Explicit client if given; otherwise the shared per-loop client is used
+        self._client = client
 
         # System-specific configurations
         self.system_configs = {
@@ -76,13 +220,33 @@ class TicketRouter:
             }
         }
 
+        # Payload transformers per target system, bound once rather than per ticket
+        self._transformers = {
+            "jira": self._transform_ticket_for_jira,
+            "freshservice": self._transform_ticket_for_freshservice,
+            "slack": self._transform_ticket_for_slack,
+            "webhook_test": ProcessedTicket.to_dict,  # Generic format for testing
+            "unknown": ProcessedTicket.to_dict  # Fallback format
+        }
+
+        # Base headers per target system, built on first use
+        self._system_headers: Dict[str, Dict[str, str]] = {}
+
+        # Fully merged headers per stored team mapping
+        self._team_headers: Dict[Tuple[int, Optional[datetime], str], Dict[str, str]] = {}
+
         # Circuit breaker state tracking
-        self.circuit_breaker_state = {}
-        self.failure_counts = {}
-        self.last_failure_time = {}
+        self._circuit_breakers: Dict[str, _CircuitBreakerState] = {}
+
+    @property
+    def client(self) -> AsyncClient:
+        """HTTP client used for routing requests"""
+        return self._client if self._client is not None else get_shared_client()
 
-    def _get_system_from_endpoint(self, endpoint: str) -> str:
-        """Identify target system from endpoint URL"""
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _get_system_from_endpoint(endpoint: str) -> str:
+        """Identify target system from endpoint URL (memoized; endpoints repeat across tickets)"""
         parsed = urlparse(endpoint)
         domain = parsed.netloc.lower()
 
@@ -99,13 +263,6 @@ class TicketRouter:
 
     def _transform_ticket_for_jira(self, ticket: ProcessedTicket) -> Dict[str, Any]:
         """Transform ticket data for Jira API format"""
-        priority_mapping = {
-            TicketPriority.LOW: "Low",
-            TicketPriority.MEDIUM: "Medium",
-            TicketPriority.HIGH: "High",
-            TicketPriority.CRITICAL: "Highest"
-        }
-
         return {
             "fields": {
                 "project": {"key": "SUPP"},  # Default project key
@@ -126,7 +283,7 @@ class TicketRouter:
                     ]
                 },
                 "issuetype": {"name": "Task"},
-                "priority": {"name": priority_mapping.get(ticket.priority, "Medium")},
+                "priority": {"name": JIRA_PRIORITIES.get(ticket.priority, "Medium")},
                 "reporter": {"emailAddress": ticket.email},
                 "labels": [
                     f"department:{ticket.department.value.lower()}" if ticket.department else "department:general",
@@ -139,19 +296,12 @@ class TicketRouter:
 
     def _transform_ticket_for_freshservice(self, ticket: ProcessedTicket) -> Dict[str, Any]:
         """Transform ticket data for Freshservice API format"""
-        priority_mapping = {
-            TicketPriority.LOW: 1,
-            TicketPriority.MEDIUM: 2,
-            TicketPriority.HIGH: 3,
-            TicketPriority.CRITICAL: 4
-        }
-
         return {
             "ticket": {
                 "subject": ticket.title,
                 "description": ticket.description,
                 "email": ticket.email,
-                "priority": priority_mapping.get(ticket.priority, 2),
+                "priority": FRESHSERVICE_PRIORITIES.get(ticket.priority, 2),
                 "status": 2,  # Open status
                 "source": 2,  # Email source
                 "tags": [
@@ -169,18 +319,16 @@ class TicketRouter:
 
     def _transform_ticket_for_slack(self, ticket: ProcessedTicket) -> Dict[str, Any]:
         """Transform ticket data for Slack webhook format"""
-        color_mapping = {
-            TicketPriority.LOW: "#36a64f",  # Green
-            TicketPriority.MEDIUM: "#ff9500",  # Orange
-            TicketPriority.HIGH: "#ff0000",  # Red
-            TicketPriority.CRITICAL: "#800080"  # Purple
-        }
+        # Slack field values are capped at 300 characters, ellipsis included
+        description = ticket.description
+        if len(description) > 300:
+            description = f"{description[:299]}…"
 
         return {
             "text": f"New Ticket: {ticket.title}",
             "attachments": [
                 {
-                    "color": color_mapping.get(ticket.priority, "#36a64f"),
+                    "color": SLACK_COLORS.get(ticket.priority, "#36a64f"),
                     "fields": [
                         {
                             "title": "Title",
@@ -189,8 +337,7 @@ class TicketRouter:
                         },
                         {
                             "title": "Description",
-                            "value": ticket.description[:300] + "..." if len(
-                                ticket.description) > 300 else ticket.description,
+                            "value": description,
                             "short": False
                         },
                         {
@@ -215,59 +362,58 @@ class TicketRouter:
                         }
                     ],
                     "footer": f"Ticket ID: {ticket.ticket_id}",
-                    "ts": int(ticket.created_at.timestamp()) if ticket.created_at else int(time.time())
+                    "ts": ticket.created_at_epoch or (
+                        int(ticket.created_at.timestamp()) if ticket.created_at else int(time.time()))
                 }
             ]
         }
 
     def _transform_ticket_payload(self, ticket: ProcessedTicket, system: str) -> Dict[str, Any]:
         """Transform ticket to appropriate format based on target system"""
-        transformers = {
-            "jira": self._transform_ticket_for_jira,
-            "freshservice": self._transform_ticket_for_freshservice,
-            "slack": self._transform_ticket_for_slack,
-            "webhook_test": lambda t: t.to_dict(),  # Generic format for testing
-            "unknown": lambda t: t.to_dict()  # Fallback format
-        }
-
-        transformer = transformers.get(system, transformers["unknown"])
+        transformer = self._transformers.get(system, ProcessedTicket.to_dict)
         return transformer(ticket)
 
     def _is_circuit_breaker_open(self, endpoint: str) -> bool:
         """Check if circuit breaker is open for endpoint"""
-        if endpoint not in self.circuit_breaker_state:
-            return False
-
-        # Circuit breaker opens after 5 failures
-        failure_count = self.failure_counts.get(endpoint, 0)
-        if failure_count < 5:
+        # Fast path: healthy endpoints are one lookup and one attribute load
+        state = self._circuit_breakers.get(endpoint)
+        if state is None or not state.open:
             return False
 
         # Reset circuit breaker after 5 minutes
-        last_failure = self.last_failure_time.get(endpoint, 0)
-        if time.time() - last_failure > 300:  # 5 minutes
-            self.circuit_breaker_state[endpoint] = False
-            self.failure_counts[endpoint] = 0
+        if time.monotonic() - state.last_failure_at > 300:  # 5 minutes
+            state.open = False
+            state.failures = 0
             return False
 
-        return self.circuit_breaker_state.get(endpoint, False)
+        return True
+
+    def _circuit_breaker(self, endpoint: str) -> _CircuitBreakerState:
+        """Get or create circuit breaker state for endpoint"""
+        state = self._circuit_breakers.get(endpoint)
+        if state is None:
+            state = self._circuit_breakers[endpoint] = _CircuitBreakerState()
+        return state
 
     def _record_failure(self, endpoint: str):
         """Record failure for circuit breaker logic"""
-        self.failure_counts[endpoint] = self.failure_counts.get(endpoint, 0) + 1
-        self.last_failure_time[endpoint] = time.time()
+        state = self._circuit_breaker(endpoint)
+        state.failures += 1
+        state.last_failure_at = time.monotonic()
 
-        if self.failure_counts[endpoint] >= 5:
-            self.circuit_breaker_state[endpoint] = True
+        if state.failures >= 5:
+            state.open = True
 
     def _record_success(self, endpoint: str):
         """Record success and reset circuit breaker state"""
-        self.failure_counts[endpoint] = 0
-        self.circuit_breaker_state[endpoint] = False
+        state = self._circuit_breaker(endpoint)
+        state.failures = 0
+        state.open = False
 
-    def _prepare_headers(self, team_mapping: TeamMapping, system: str) -> Dict[str, str]:
-        """Prepare HTTP headers based on system configuration and team mapping"""
-        headers = {"User-Agent": "TicketTriageAgent/1.0"}
+    def _build_system_headers(self, system: str) -> Dict[str, str]:
+        """Build the base HTTP headers for a target system"""
+        # Payloads are sent as pre-serialized JSON bytes
+        headers = {"User-Agent": "TicketTriageAgent/1.0", "Content-Type": "application/json"}
 
         # Add system-specific headers
         system_config = self.system_configs.get(system, {})
@@ -277,14 +423,57 @@ class TicketRouter:
         if "auth_header" in system_config and system != "slack":
             headers["Authorization"] = system_config["auth_header"]
 
+        return headers
+
+    def _prepare_headers(self, team_mapping: TeamMapping, system: str) -> Dict[str, str]:
+        """
+        Prepare HTTP headers based on system configuration and team mapping.
+        Merged headers of stored mappings are cached; the returned dict must not be mutated.
+        """
+        # Stored mappings are identified by row id + updated_at, which changes on every edit
+        cache_key = (team_mapping.id, team_mapping.updated_at, system) if team_mapping.id is not None else None
+        if cache_key is not None:
+            cached = self._team_headers.get(cache_key)
+            if cached is not None:
+                return cached
+
+        base_headers = self._system_headers.get(system)
+        if base_headers is None:
+            base_headers = self._system_headers[system] = self._build_system_headers(system)
+        headers = dict(base_headers)
+
         # Add team mapping headers (override system defaults)
         if team_mapping.api_headers:
             headers.update(team_mapping.api_headers)
 
+        if cache_key is not None:
+            self._team_headers[cache_key] = headers
         return headers
 
+    @retry_with_backoff(max_attempts=3, exceptions=(httpx.RequestError, httpx.HTTPStatusError),
+                        retry_if=_is_retryable, wait_hint=_retry_after_seconds)
+    async def _route_once(self, team_mapping: TeamMapping, system: str, body: bytes,
+                          headers: Dict[str, str], api_logger: APICallLogger) -> httpx.Response:
+        """Send one prepared routing request; retried on connect failures, 429 and 5xx"""
+        response = await self.client.request(
+            method=team_mapping.api_method,
+            url=team_mapping.api_endpoint,
+            content=body,
+            headers=headers,
+            follow_redirects=system in REDIRECT_SYSTEMS
+        )
+
+        # Log response
+        api_logger.log_response(
+            status_code=response.status_code,
+            response_size=len(response.content) if response.content else 0
+        )
+
+        # Check response status (a 429/503 Retry-After stretches the retry wait, see _retry_after_seconds)
+        response.raise_for_status()
+        return response
+
     @timing_decorator("ticket_routing")
-    @retry_with_backoff(max_attempts=3, exceptions=(httpx.RequestError, httpx.HTTPStatusError))
     async def route_ticket(self, ticket: ProcessedTicket, team_mapping: TeamMapping) -> RoutingResult:
         """
         Route ticket to external system based on team mapping.
@@ -299,6 +488,9 @@ class TicketRouter:
         ticket_logger = TicketLogger(ticket.ticket_id)
         start_time = time.time()
 
+        # Resolved up front so every failure path can report it
+        system = self._get_system_from_endpoint(team_mapping.api_endpoint)
+
         try:
             # Check circuit breaker
             if self._is_circuit_breaker_open(team_mapping.api_endpoint):
@@ -312,8 +504,7 @@ class TicketRouter:
                     processing_time_ms=int((time.time() - start_time) * 1000)
                 )
 
-            # Identify target system and prepare payload
-            system = self._get_system_from_endpoint(team_mapping.api_endpoint)
+            # Prepare payload for the target system
             payload = self._transform_ticket_payload(ticket, system)
             headers = self._prepare_headers(team_mapping, system)
 
@@ -327,29 +518,16 @@ class TicketRouter:
                 method=team_mapping.api_method
             )
 
-            # Log outgoing request
-            payload_json = json.dumps(payload)
-            api_logger.log_request(payload_size=len(payload_json.encode('utf-8')))
-
-            # Make HTTP request
-            response = await self.client.request(
-                method=team_mapping.api_method,
-                url=team_mapping.api_endpoint,
-                json=payload,
-                headers=headers
-            )
+            # Serialize once; the same bytes are logged and sent
+            body = orjson.dumps(payload)
+            api_logger.log_request(payload_size=len(body))
 
-            # Log response
-            api_logger.log_response(
-                status_code=response.status_code,
-                response_size=len(response.content) if response.content else 0
-            )
+            # Make HTTP request (loggers, payload and body are built once, outside the retries)
+            response = await self._route_once(team_mapping, system, body, headers, api_logger)
 
-            # Check response status
-            response.raise_for_status()
-
-            # Parse response for external ticket ID
-            external_ticket_id = self._extract_ticket_id(response, system)
+            # Parse the body once; it feeds both ID extraction and the result
+            response_data = self._parse_response_body(response)
+            external_ticket_id = self._extract_ticket_id(response_data, system)
             processing_time = int((time.time() - start_time) * 1000)
 
             # Record success
@@ -365,88 +543,80 @@ class TicketRouter:
                 success=True,
                 system_name=system,
                 external_ticket_id=external_ticket_id,
-                response_data=response.json() if response.content else {},
+                response_data=response_data,
                 http_status_code=response.status_code,
                 processing_time_ms=processing_time
             )
 
         except httpx.HTTPStatusError as e:
-            error_msg = f"HTTP error {e.response.status_code}: {e.response.text}"
-            self._record_failure(team_mapping.api_endpoint)
+            # Keep only the head of the body; error pages can be megabytes of HTML
+            error_body = (await e.response.aread())[:ERROR_BODY_LIMIT].decode("utf-8", "replace")
+            error_msg = f"HTTP error {e.response.status_code}: {error_body}"
+            return self._fail(ticket_logger, team_mapping, system, error_msg, start_time, e.response.status_code)
 
-            processing_time = int((time.time() - start_time) * 1000)
-            ticket_logger.log_routing_failure(system or "unknown", error_msg, processing_time)
+        except httpx.RequestError as e:
+            return self._fail(ticket_logger, team_mapping, system, f"Request error: {str(e)}", start_time)
 
-            return RoutingResult(
-                success=False,
-                system_name=system or "unknown",
-                error_message=error_msg,
-                http_status_code=e.response.status_code,
-                processing_time_ms=processing_time
-            )
+        except Exception as e:
+            return self._fail(ticket_logger, team_mapping, system, f"Unexpected error: {str(e)}", start_time)
+
+    def _fail(self, ticket_logger: TicketLogger, team_mapping: TeamMapping, system: str, error_msg: str,
+              start_time: float, http_status_code: Optional[int] = None) -> RoutingResult:
+        """Record a routing failure for the circuit breaker, log it and build the failed result"""
+        self._record_failure(team_mapping.api_endpoint)
+
+        processing_time = int((time.time() - start_time) * 1000)
+        ticket_logger.log_routing_failure(system, error_msg, processing_time)
+
+        return RoutingResult(
+            success=False,
+            system_name=system,
+            error_message=error_msg,
+            http_status_code=http_status_code,
+            processing_time_ms=processing_time
+        )
 
-        except httpx.RequestError as e:
-            error_msg = f"Request error: {str(e)}"
-            self._record_failure(team_mapping.api_endpoint)
+    async def route_tickets_batch(self, items: List[Tuple[ProcessedTicket, TeamMapping]]) -> List[RoutingResult]:
+        """
+        Route several tickets concurrently over the shared connection pool.
 
-            processing_time = int((time.time() - start_time) * 1000)
-            ticket_logger.log_routing_failure(system or "unknown", error_msg, processing_time)
+        Results are returned in the same order as items. In-flight requests are
+        capped at the client's max_connections so the pool is never oversubscribed.
+        """
+        slots = asyncio.Semaphore(self.limits.max_connections)
 
-            return RoutingResult(
-                success=False,
-                system_name=system or "unknown",
-                error_message=error_msg,
-                processing_time_ms=processing_time
-            )
+        async def _route(ticket: ProcessedTicket, team_mapping: TeamMapping) -> RoutingResult:
+            async with slots:
+                return await self.route_ticket(ticket, team_mapping)
 
-        except Exception as e:
-            error_msg = f"Unexpected error: {str(e)}"
-            self._record_failure(team_mapping.api_endpoint)
+        return list(await asyncio.gather(*(_route(ticket, mapping) for ticket, mapping in items)))
 
-            processing_time = int((time.time() - start_time) * 1000)
-            ticket_logger.log_routing_failure(system or "unknown", error_msg, processing_time)
+    async def route_multi(self, ticket: ProcessedTicket, mappings: List[TeamMapping]) -> List[RoutingResult]:
+        """
+        Route one ticket to several systems at once (e.g. create in Jira and notify Slack).
 
-            return RoutingResult(
-                success=False,
-                system_name=system or "unknown",
-                error_message=error_msg,
-                processing_time_ms=processing_time
-            )
+        Latency is the slowest destination rather than the sum. route_ticket reports
+        failures as results, so one failing destination does not affect the others.
+        """
+        return list(await asyncio.gather(*(self.route_ticket(ticket, mapping) for mapping in mappings)))
+
+    def _parse_response_body(self, response: httpx.Response) -> Dict[str, Any]:
+        """Decode a JSON response body; empty or non-JSON bodies (e.g. Slack's "ok") give {}"""
+        if not response.content:
+            return {}
 
-    def _extract_ticket_id(self, response: httpx.Response, system: str) -> Optional[str]:
-        """Extract external ticket ID from API response"""
         try:
-            if not response.content:
-                return None
-
-            response_data = response.json()
-
-            # System-specific ID extraction
-            if system == "jira":
-                return response_data.get("key") or response_data.get("id")
-            elif system == "freshservice":
-                ticket_data = response_data.get("ticket", {})
-                return str(ticket_data.get("id")) if ticket_data.get("id") else None
-            elif system == "slack":
-                # Slack webhooks don't return ticket IDs
-                return f"slack_{int(time.time())}"
-            else:
-                # Generic extraction attempts
-                for key in ["id", "ticket_id", "key", "number"]:
-                    if key in response_data:
-                        return str(response_data[key])
-
-                # Look in nested objects
-                for nested_key in ["ticket", "issue", "data"]:
-                    nested_data = response_data.get(nested_key, {})
-                    if isinstance(nested_data, dict):
-                        for key in ["id", "ticket_id", "key", "number"]:
-                            if key in nested_data:
-                                return str(nested_data[key])
+            return orjson.loads(response.content)
+        except json.JSONDecodeError:
+            return {}
 
-            return None
+    def _extract_ticket_id(self, response_data: Dict[str, Any], system: str) -> Optional[str]:
+        """Extract external ticket ID from a parsed API response"""
+        try:
+            # System-specific ID extraction, dispatched by table
+            return TICKET_ID_EXTRACTORS.get(system, _generic_ticket_id)(response_data)
 
-        except (json.JSONDecodeError, AttributeError):
+        except AttributeError:
             return None
 
     async def test_endpoint(self, endpoint: str, method: str = "GET") -> Dict[str, Any]:
@@ -455,7 +625,8 @@ class TicketRouter:
             response = await self.client.request(
                 method=method,
                 url=endpoint,
-                timeout=Timeout(connect=5.0, read=10.0)
+                timeout=TEST_ENDPOINT_TIMEOUT,
+                follow_redirects=True
             )
 
             return {
@@ -475,8 +646,8 @@ class TicketRouter:
     def get_routing_stats(self) -> Dict[str, Any]:
         """Get routing service statistics"""
         return {
-            "circuit_breaker_state": self.circuit_breaker_state,
-            "failure_counts": self.failure_counts,
+            "circuit_breaker_state": {endpoint: state.open for endpoint, state in self._circuit_breakers.items()},
+            "failure_counts": {endpoint: state.failures for endpoint, state in self._circuit_breakers.items()},
             "supported_systems": list(self.system_configs.keys()),
             "client_stats": {
                 "max_connections": self.limits.max_connections,
@@ -491,4 +662,7 @@ class TicketRouter:
 
     async def close(self):
         """Close HTTP client and cleanup resources"""
-        await self.client.aclose()
\ No newline at end of file
+        if self._client is not None:
+            await self._client.aclose()
+        else:
+            await close_shared_client()
\ No newline at end of file
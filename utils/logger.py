@@ -4,41 +4,194 @@ Provides structured logging and monitoring for production environments.
 """
 
 import os
+import re
+import sys
 import time
+import asyncio
+import queue
+import atexit
+import random
+import threading
 import logging
 import functools
-from typing import Any, Callable, Optional, Dict
-from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Callable, Optional, Dict, List, Tuple
+from datetime import datetime, timezone
 from contextlib import contextmanager
 
+import orjson
 import structlog
 from prometheus_client import Counter, Histogram, Gauge, start_http_server
 from tenacity import (
     retry,
     stop_after_attempt,
     wait_exponential,
+    wait_random_exponential,
+    retry_if_exception,
     retry_if_exception_type,
     before_sleep_log
 )
 
-# Configure structured logging
-logging.basicConfig(
-    format="%(message)s",
-    stream=None,
-    level=getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper())
+# Log records go through a bounded queue drained by a background thread,
+# so request handlers never block on the stream write
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_QUEUE_DROP_WHEN_FULL = os.getenv("LOG_QUEUE_DROP_WHEN_FULL", "true").lower() == "true"
+
+# Log output buffer size (bytes) and how often it is flushed (seconds)
+LOG_BUFFER_SIZE = int(os.getenv("LOG_BUFFER_SIZE", "65536"))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "0.1"))
+
+# Max INFO/DEBUG records per second (0 disables the limit); warnings and errors always pass
+LOG_RATE_LIMIT = float(os.getenv("LOG_RATE_LIMIT", "1000"))
+
+# Fraction of successful (2xx) external API responses that are logged; failures are always logged
+API_LOG_SAMPLE_RATE = float(os.getenv("API_LOG_SAMPLE_RATE", "0.1"))
+
+# Log records discarded before output (rate limit or full queue), exported so losses are visible
+LOG_RECORDS_DROPPED = Counter(
+    'log_records_dropped_total',
+    'Log records discarded before output',
+    ['reason']
 )
 
+
+class _RateLimitFilter(logging.Filter):
+    """Token-bucket limit on low-severity records; suppressed records are counted in LOG_RECORDS_DROPPED"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+        self.tokens = rate
+        self.last_refill = time.monotonic()
+        self._suppressed = LOG_RECORDS_DROPPED.labels(reason="rate_limited")
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+
+        self._suppressed.inc()
+        return False
+
+
+class _BoundedQueueHandler(QueueHandler):
+    """QueueHandler that drops records (counted in LOG_RECORDS_DROPPED) instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue, drop_when_full: bool = True):
+        super().__init__(log_queue)
+        self.drop_when_full = drop_when_full
+        self._dropped = LOG_RECORDS_DROPPED.labels(reason="queue_full")
+
+    def enqueue(self, record: logging.LogRecord):
+        if not self.drop_when_full:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self._dropped.inc()
+
+
+class _BufferedStreamHandler(logging.StreamHandler):
+    """
+    Stream handler that writes into a large buffer and flushes on a timer
+    instead of after every record, turning many small writes into few syscalls.
+    """
+
+    def __init__(self, stream, flush_interval: float):
+        super().__init__(stream)
+        self._stop_flushing = threading.Event()
+        self._flush_interval = flush_interval
+        self._flusher = threading.Thread(target=self._flush_periodically, name="log-flusher", daemon=True)
+        self._flusher.start()
+
+    def _flush_periodically(self):
+        while not self._stop_flushing.wait(self._flush_interval):
+            self.flush()
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        self._stop_flushing.set()
+        self.flush()
+        super().close()
+
+
+def _configure_log_handlers() -> QueueListener:
+    """Attach the queue handler to the root logger and start the writer thread"""
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+
+    # 64KB-buffered text stream over stderr (where basicConfig used to write); not closed with the handler
+    log_stream = open(sys.stderr.fileno(), "w", buffering=LOG_BUFFER_SIZE, encoding="utf-8", closefd=False)
+    sink_handler = _BufferedStreamHandler(log_stream, LOG_FLUSH_INTERVAL)
+    sink_handler.setFormatter(logging.Formatter("%(message)s"))
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper()))
+    queue_handler = _BoundedQueueHandler(log_queue, LOG_QUEUE_DROP_WHEN_FULL)
+    if LOG_RATE_LIMIT > 0:
+        queue_handler.addFilter(_RateLimitFilter(LOG_RATE_LIMIT))
+    root_logger.addHandler(queue_handler)
+
+    listener = QueueListener(log_queue, sink_handler, respect_handler_level=True)
+    listener.start()
+    # On interpreter exit: drain the queue (runs first, atexit is LIFO), then flush the buffer
+    atexit.register(sink_handler.close)
+    atexit.register(listener.stop)
+    return listener
+
+
+# Configure structured logging
+log_listener = _configure_log_handlers()
+
+
+class _UTCTimeStamper:
+    """
+    structlog processor adding an ISO-8601 UTC "timestamp" (same format as TimeStamper(fmt="iso")).
+    The date/time part is formatted once per second; only the microseconds change per record.
+    """
+
+    def __init__(self):
+        self._second_prefix = (None, "")
+
+    def __call__(self, _logger, _method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+        now = time.time()
+        second = int(now)
+        cached_second, prefix = self._second_prefix
+        if cached_second != second:
+            prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+            self._second_prefix = (second, prefix)
+        event_dict["timestamp"] = f"{prefix}.{int((now - second) * 1_000_000):06d}Z"
+        return event_dict
+
+
+def _orjson_dumps(event_dict: Dict[str, Any], **kwargs) -> str:
+    """Serialize a log event with orjson; stdlib handlers expect str, not bytes"""
+    return orjson.dumps(event_dict, default=kwargs.get("default"), option=orjson.OPT_NON_STR_KEYS).decode()
+
+
 structlog.configure(
     processors=[
         structlog.stdlib.filter_by_level,
+        structlog.contextvars.merge_contextvars,
         structlog.stdlib.add_logger_name,
         structlog.stdlib.add_log_level,
         structlog.stdlib.PositionalArgumentsFormatter(),
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.StackInfoRenderer(),
+        _UTCTimeStamper(),
         structlog.processors.format_exc_info,
         structlog.processors.UnicodeDecoder(),
-        structlog.processors.JSONRenderer()
+        structlog.processors.JSONRenderer(serializer=_orjson_dumps)
     ],
     context_class=dict,
     logger_factory=structlog.stdlib.LoggerFactory(),
@@ -55,10 +208,13 @@ TICKET_COUNTER = Counter(
     ['status', 'department']
 )
 
+# Histograms carry few labels and buckets (each label combination costs a series per bucket);
+# success/error attribution lives on the counters
 TICKET_PROCESSING_TIME = Histogram(
     'ticket_processing_seconds',
     'Time spent processing tickets',
-    ['operation', 'status']
+    ['operation'],
+    buckets=(0.05, 0.25, 1, 5, 30)
 )
 
 CLASSIFICATION_ACCURACY = Gauge(
@@ -76,7 +232,8 @@ API_REQUEST_COUNTER = Counter(
 API_REQUEST_DURATION = Histogram(
     'api_request_duration_seconds',
     'API request duration',
-    ['endpoint', 'method']
+    ['endpoint_template', 'method'],
+    buckets=(0.1, 0.5, 1, 2.5, 10)
 )
 
 ACTIVE_CONNECTIONS = Gauge(
@@ -90,6 +247,26 @@ ERROR_COUNTER = Counter(
     ['error_type', 'component']
 )
 
+TICKET_LOGS_DROPPED = Counter(
+    'ticket_logs_dropped_total',
+    'Ticket log rows that could not be written to the database'
+)
+
+# Path segments that identify a single resource (numbers, hex ids/UUIDs, webhook tokens)
+_ENDPOINT_ID_SEGMENT = re.compile(r"/(?:\d+|[0-9a-fA-F-]{16,})(?=/|$)")
+
+
+def endpoint_template(endpoint: str) -> str:
+    """Collapse id-like path segments and drop the query string so metrics use one series per route"""
+    return _ENDPOINT_ID_SEGMENT.sub("/{id}", endpoint.split("?", 1)[0])
+
+
+# Prebuilt label strings for common HTTP status codes
+_STATUS_CODE_LABELS = {
+    code: str(code)
+    for code in (200, 201, 202, 204, 301, 302, 400, 401, 403, 404, 409, 422, 429, 500, 502, 503, 504)
+}
+
 
 class MetricsManager:
     """
@@ -97,47 +274,93 @@ class MetricsManager:
     Tracks ticket processing, API calls, and system health.
     """
 
+    def __new__(cls, metrics_port: int = 8001):
+        # With metrics disabled hand back a no-op recorder instead of branching on every call
+        if os.getenv("PROMETHEUS_METRICS_ENABLED", "true").lower() != "true":
+            return _NoopMetrics(metrics_port)
+        return super().__new__(cls)
+
     def __init__(self, metrics_port: int = 8001):
         self.metrics_port = metrics_port
-        self.metrics_enabled = os.getenv("PROMETHEUS_METRICS_ENABLED", "true").lower() == "true"
-
-        if self.metrics_enabled:
-            # Start Prometheus metrics server
-            start_http_server(self.metrics_port)
-            logger.info("Prometheus metrics server started", port=self.metrics_port)
+        self.metrics_enabled = True
+
+        # Exporter is started by the app (start_server), not as an import side effect
+        self.server_started = False
+        self._server_lock = threading.Lock()
+
+        # Label-bound metric children, resolved once per label combination
+        self._ticket_children: Dict[Tuple[str, ...], Any] = {}
+        self._confidence_children: Dict[Tuple[str, ...], Any] = {}
+        self._api_count_children: Dict[Tuple[str, ...], Any] = {}
+        self._api_duration_children: Dict[Tuple[str, ...], Any] = {}
+        self._error_children: Dict[Tuple[str, ...], Any] = {}
+
+    def start_server(self):
+        """Start the Prometheus metrics HTTP server once per process"""
+        with self._server_lock:
+            if self.server_started:
+                return
+            try:
+                start_http_server(self.metrics_port)
+            except OSError as e:
+                # e.g. another worker process already bound the port
+                logger.warning("Prometheus metrics server not started", port=self.metrics_port, error=str(e))
+                return
+            self.server_started = True
+        logger.info("Prometheus metrics server started", port=self.metrics_port)
+
+    @staticmethod
+    def _child(cache: Dict[Tuple[str, ...], Any], metric, *label_values: str):
+        """Get the metric child for label values (in declaration order), caching the .labels() lookup"""
+        child = cache.get(label_values)
+        if child is None:
+            child = cache[label_values] = metric.labels(*label_values)
+        return child
 
     def record_ticket_processed(self, status: str, department: str = "unknown"):
         """Record ticket processing metrics"""
-        if self.metrics_enabled:
-            TICKET_COUNTER.labels(status=status, department=department).inc()
+        self._child(self._ticket_children, TICKET_COUNTER, status, department).inc()
 
     def record_classification_confidence(self, department: str, confidence: float):
         """Record AI classification confidence"""
-        if self.metrics_enabled:
-            CLASSIFICATION_ACCURACY.labels(department=department).set(confidence)
+        self._child(self._confidence_children, CLASSIFICATION_ACCURACY, department).set(confidence)
 
     def record_api_request(self, endpoint: str, method: str, status_code: int, duration: float):
         """Record external API request metrics"""
-        if self.metrics_enabled:
-            API_REQUEST_COUNTER.labels(
-                endpoint=endpoint,
-                method=method,
-                status_code=str(status_code)
-            ).inc()
-            API_REQUEST_DURATION.labels(endpoint=endpoint, method=method).observe(duration)
+        status_label = _STATUS_CODE_LABELS.get(status_code) or str(status_code)
+        self._child(self._api_count_children, API_REQUEST_COUNTER, endpoint, method, status_label).inc()
+        self._child(self._api_duration_children, API_REQUEST_DURATION, endpoint, method).observe(duration)
 
     def record_error(self, error_type: str, component: str):
         """Record error occurrence"""
-        if self.metrics_enabled:
-            ERROR_COUNTER.labels(error_type=error_type, component=component).inc()
+        self._child(self._error_children, ERROR_COUNTER, error_type, component).inc()
 
     def set_active_connections(self, count: int):
         """Update active database connections gauge"""
-        if self.metrics_enabled:
-            ACTIVE_CONNECTIONS.set(count)
+        ACTIVE_CONNECTIONS.set(count)
 
 
-# Global metrics manager
+class _NoopMetrics:
+    """Stand-in for MetricsManager when PROMETHEUS_METRICS_ENABLED is false; every call is a no-op"""
+
+    metrics_enabled = False
+    server_started = False
+
+    def __init__(self, metrics_port: int = 8001):
+        self.metrics_port = metrics_port
+
+    def _noop(self, *args, **kwargs):
+        return None
+
+    start_server = _noop
+    record_ticket_processed = _noop
+    record_classification_confidence = _noop
+    record_api_request = _noop
+    record_error = _noop
+    set_active_connections = _noop
+
+
+# Global metrics manager (a _NoopMetrics when metrics are disabled)
 metrics = MetricsManager()
 
 
@@ -149,12 +372,14 @@ def timing_decorator(operation: str):
         operation: Name of the operation being timed
     """
 
+    # Histogram child for this operation, bound once per decorated function
+    duration_histogram = TICKET_PROCESSING_TIME.labels(operation=operation)
+
     def decorator(func: Callable) -> Callable:
         @functools.wraps(func)
         async def async_wrapper(*args, **kwargs):
-            start_time = time.time()
+            start_ns = time.perf_counter_ns()
             status = "success"
-
             try:
                 result = await func(*args, **kwargs)
                 return result
@@ -163,18 +388,38 @@ def timing_decorator(operation: str):
                 metrics.record_error(type(e).__name__, operation)
                 raise
             finally:
-                duration = time.time() - start_time
-                TICKET_PROCESSING_TIME.labels(operation=operation, status=status).observe(duration)
+                duration_ns = time.perf_counter_ns() - start_ns
+                duration_histogram.observe(duration_ns / 1e9)
+                logger.info(
+                    "Operation completed",
+                    operation=operation,
+                    duration_ms=duration_ns // 1_000_000,
+                    status=status
+                )
 
+        @functools.wraps(func)
+        def sync_wrapper(*args, **kwargs):
+            start_ns = time.perf_counter_ns()
+            status = "success"
+            try:
+                result = func(*args, **kwargs)
+                return result
+            except Exception as e:
+                status = "error"
+                metrics.record_error(type(e).__name__, operation)
+                raise
+            finally:
+                duration_ns = time.perf_counter_ns() - start_ns
+                duration_histogram.observe(duration_ns / 1e9)
                 logger.info(
                     "Operation completed",
                     operation=operation,
-                    duration_ms=round(duration * 1000, 2),
+                    duration_ms=duration_ns // 1_000_000,
                     status=status
                 )
 
-        # Return appropriate wrapper based on function type
-        return async_wrapper if hasattr(func, '__code__') and 'async' in str(func.__code__) else sync_wrapper
+        # Chosen once at decoration time
+        return async_wrapper if asyncio.iscoroutinefunction(func) else sync_wrapper
 
     return decorator
 
@@ -182,7 +427,10 @@ def timing_decorator(operation: str):
 def retry_with_backoff(
         max_attempts: int = 3,
         backoff_factor: float = 2,
-        exceptions: tuple = (Exception,)
+        exceptions: tuple = (Exception,),
+        jitter: bool = True,
+        retry_if: Optional[Callable[[BaseException], bool]] = None,
+        wait_hint: Optional[Callable[[BaseException], Optional[float]]] = None
 ):
     """
     Retry decorator with exponential backoff for production resilience.
@@ -191,13 +439,37 @@ def retry_with_backoff(
         max_attempts: Maximum number of retry attempts
         backoff_factor: Exponential backoff multiplier
         exceptions: Tuple of exceptions to retry on
+        jitter: Use full jitter (random wait up to the exponential bound) so
+            concurrent callers do not retry in lockstep; on by default,
+            pass False for deterministic delays
+        retry_if: Optional predicate narrowing which of those exceptions are
+            retried (e.g. only failures that are safe to repeat)
+        wait_hint: Optional callable returning a minimum delay (seconds) requested
+            by the failure itself, e.g. a Retry-After header; the wait before the
+            next attempt is the larger of this and the backoff
     """
+    if jitter:
+        wait = wait_random_exponential(multiplier=1, max=60, exp_base=backoff_factor)
+    else:
+        wait = wait_exponential(multiplier=1, min=1, max=60, exp_base=backoff_factor)
+
+    if wait_hint is not None:
+        backoff = wait
+
+        def wait(retry_state) -> float:
+            delay = backoff(retry_state)
+            hint = wait_hint(retry_state.outcome.exception())
+            return max(delay, hint) if hint else delay
+
+    retry_condition = retry_if_exception_type(exceptions)
+    if retry_if is not None:
+        retry_condition = retry_if_exception(lambda e: isinstance(e, exceptions) and retry_if(e))
 
     def decorator(func: Callable) -> Callable:
         @retry(
             stop=stop_after_attempt(max_attempts),
-            wait=wait_exponential(multiplier=1, min=1, max=60, exp_base=backoff_factor),
-            retry=retry_if_exception_type(exceptions),
+            wait=wait,
+            retry=retry_condition,
             before_sleep=before_sleep_log(logger, logging.WARNING),
             reraise=True
         )
@@ -216,8 +488,8 @@ def retry_with_backoff(
 
         @retry(
             stop=stop_after_attempt(max_attempts),
-            wait=wait_exponential(multiplier=1, min=1, max=60, exp_base=backoff_factor),
-            retry=retry_if_exception_type(exceptions),
+            wait=wait,
+            retry=retry_condition,
             before_sleep=before_sleep_log(logger, logging.WARNING),
             reraise=True
         )
@@ -235,7 +507,7 @@ def retry_with_backoff(
                 raise
 
         # Return appropriate wrapper based on function type
-        return async_wrapper if hasattr(func, '__code__') and 'async' in str(func.__code__) else sync_wrapper
+        return async_wrapper if asyncio.iscoroutinefunction(func) else sync_wrapper
 
     return decorator
 
@@ -249,14 +521,15 @@ def log_context(**kwargs):
         with log_context(ticket_id="123", operation="classify"):
             logger.info("Processing ticket")
     """
-    bound_logger = logger.bind(**kwargs)
-    structlog.contextvars.clear_contextvars()
-    structlog.contextvars.bind_contextvars(**kwargs)
+    # Only the given keys are bound (and restored on exit); the caller's existing context is kept.
+    # merge_contextvars adds them to every record, so the module logger needs no extra bind
+    with structlog.contextvars.bound_contextvars(**kwargs):
+        yield logger
 
-    try:
-        yield bound_logger
-    finally:
-        structlog.contextvars.clear_contextvars()
+
+def _truncate(text: str, limit: int) -> str:
+    """Cap text at limit characters for logging, marking cuts with a single ellipsis character"""
+    return text if len(text) <= limit else f"{text[:limit - 1]}…"
 
 
 class TicketLogger:
@@ -265,71 +538,116 @@ class TicketLogger:
     Provides consistent logging patterns across the application.
     """
 
-    def __init__(self, ticket_id: str):
+    def __init__(self, ticket_id: str, buffered: bool = False):
         self.ticket_id = ticket_id
-        self.logger = logger.bind(ticket_id=ticket_id)
-        self.start_time = time.time()
+        # Inside a ticket's logging context (see __enter__) the context already carries ticket_id;
+        # outside one, bind it to this logger only so no context is overwritten or left behind
+        if "ticket_id" in structlog.contextvars.get_contextvars():
+            self.logger = logger
+        else:
+            self.logger = logger.bind(ticket_id=ticket_id)
+        self._context_tokens: Optional[Dict[str, Any]] = None
+        self._start_ns = time.perf_counter_ns()
+
+        # Buffered mode: info/debug events are collected and written as one "Ticket trace"
+        # record; warnings/errors and completion flush the buffer first
+        self._events: Optional[List[Dict[str, Any]]] = [] if buffered else None
+
+    def __enter__(self) -> 'TicketLogger':
+        # Bind ticket_id to the logging context for the block; tasks created inside it inherit it
+        self._context_tokens = structlog.contextvars.bind_contextvars(ticket_id=self.ticket_id)
+        self.logger = logger
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Flush buffered events and restore the logging context bound by __enter__"""
+        self.flush()
+        if self._context_tokens is not None:
+            structlog.contextvars.reset_contextvars(**self._context_tokens)
+            self._context_tokens = None
+
+    def flush(self):
+        """Write buffered events as a single record"""
+        if self._events:
+            events, self._events = self._events, []
+            self.logger.info("Ticket trace", events=events)
+
+    def _log(self, level: int, message: str, kwargs: Dict[str, Any]):
+        """Buffer or emit one event"""
+        if not self.logger.isEnabledFor(level):
+            return
+        if self._events is not None and level < logging.WARNING:
+            kwargs["event"] = message
+            kwargs["level"] = logging.getLevelName(level).lower()
+            kwargs["elapsed_ms"] = (time.perf_counter_ns() - self._start_ns) // 1_000_000
+            self._events.append(kwargs)
+            return
+        self.flush()
+        self.logger.log(level, message, **kwargs)
 
     def info(self, message: str, **kwargs):
         """Log info message with ticket context"""
-        self.logger.info(message, **kwargs)
+        self._log(logging.INFO, message, kwargs)
 
     def warning(self, message: str, **kwargs):
         """Log warning message with ticket context"""
-        self.logger.warning(message, **kwargs)
+        self._log(logging.WARNING, message, kwargs)
 
     def error(self, message: str, error: Exception = None, **kwargs):
         """Log error message with ticket context and exception details"""
+        # Skip str(error) (can be long for chained exceptions) when ERROR is filtered out
+        if not self.logger.isEnabledFor(logging.ERROR):
+            return
         if error:
             kwargs.update({
                 "error_type": type(error).__name__,
                 "error_message": str(error)
             })
-        self.logger.error(message, **kwargs)
+        self._log(logging.ERROR, message, kwargs)
 
     def debug(self, message: str, **kwargs):
         """Log debug message with ticket context"""
-        self.logger.debug(message, **kwargs)
+        self._log(logging.DEBUG, message, kwargs)
 
     def log_classification(self, department: str, confidence: float, reasoning: str):
         """Log AI classification results"""
-        self.logger.info(
-            "Ticket classified",
-            department=department,
-            confidence=confidence,
-            reasoning=reasoning[:200] + "..." if len(reasoning) > 200 else reasoning
-        )
+        self._log(logging.INFO, "Ticket classified", {
+            "department": department,
+            "confidence": confidence,
+            "reasoning": _truncate(reasoning, 200)
+        })
         metrics.record_classification_confidence(department, confidence)
 
     def log_routing_success(self, system: str, external_id: str, duration_ms: int):
         """Log successful ticket routing"""
-        self.logger.info(
-            "Ticket routed successfully",
-            system=system,
-            external_ticket_id=external_id,
-            routing_duration_ms=duration_ms
-        )
+        self._log(logging.INFO, "Ticket routed successfully", {
+            "system": system,
+            "external_ticket_id": external_id,
+            "routing_duration_ms": duration_ms
+        })
         metrics.record_ticket_processed("routed", "unknown")
 
     def log_routing_failure(self, system: str, error: str, duration_ms: int):
         """Log failed ticket routing"""
-        self.logger.error(
-            "Ticket routing failed",
-            system=system,
-            error=error,
-            routing_duration_ms=duration_ms
-        )
+        self._log(logging.ERROR, "Ticket routing failed", {
+            "system": system,
+            "error": error,
+            "routing_duration_ms": duration_ms
+        })
         metrics.record_ticket_processed("failed", "unknown")
         metrics.record_error("routing_error", "router")
 
     def log_processing_complete(self, status: str, department: str = "unknown"):
-        """Log completion of ticket processing"""
-        total_duration = (time.time() - self.start_time) * 1000
+        """Log completion of ticket processing (flushes any buffered events first)"""
+        self.flush()
         self.logger.info(
             "Ticket processing completed",
             status=status,
             department=department,
-            total_duration_ms=round(total_duration, 2)
+            total_duration_ms=(time.perf_counter_ns() - self._start_ns) // 1_000_000
         )
         metrics.record_ticket_processed(status, department)
 
@@ -342,8 +660,10 @@ class APICallLogger:
 
     def __init__(self, endpoint: str, method: str):
         self.endpoint = endpoint
+        # Metrics label; logs keep the full endpoint
+        self.endpoint_template = endpoint_template(endpoint)
         self.method = method
-        self.start_time = time.time()
+        self._start_ns = time.perf_counter_ns()
         self.logger = logger.bind(endpoint=endpoint, method=method)
 
     def log_request(self, payload_size: int = None, **kwargs):
@@ -356,12 +676,17 @@ class APICallLogger:
 
     def log_response(self, status_code: int, response_size: int = None, **kwargs):
         """Log API response with metrics"""
-        duration = time.time() - self.start_time
+        duration_ns = time.perf_counter_ns() - self._start_ns
+
+        # Successful responses are sampled; metrics below still count every request
+        if 200 <= status_code < 300 and random.random() >= API_LOG_SAMPLE_RATE:
+            metrics.record_api_request(self.endpoint_template, self.method, status_code, duration_ns / 1e9)
+            return
 
         log_data = {
             "action": "api_response_received",
             "status_code": status_code,
-            "duration_ms": round(duration * 1000, 2)
+            "duration_ms": duration_ns // 1_000_000
         }
         if response_size:
             log_data["response_size_bytes"] = response_size
@@ -376,23 +701,20 @@ class APICallLogger:
             self.logger.error("API request server error", **log_data)
 
         # Record metrics
-        metrics.record_api_request(self.endpoint, self.method, status_code, duration)
+        metrics.record_api_request(self.endpoint_template, self.method, status_code, duration_ns / 1e9)
 
     def log_error(self, error: Exception):
         """Log API request error"""
-        duration = time.time() - self.start_time
-        self.logger.error(
-            "API request failed",
-            error_type=type(error).__name__,
-            error_message=str(error),
-            duration_ms=round(duration * 1000, 2)
-        )
+        if self.logger.isEnabledFor(logging.ERROR):
+            self.logger.error(
+                "API request failed",
+                error_type=type(error).__name__,
+                error_message=str(error),
+                duration_ms=(time.perf_counter_ns() - self._start_ns) // 1_000_000
+            )
         metrics.record_error(type(error).__name__, "api_client")
 
 
-import asyncio
-
-
 def setup_logging():
     """Initialize logging configuration for the application"""
     # Configure root logger
@@ -413,68 +735,23 @@ def setup_logging():
 
 
 # Health check helpers
-def get_health_status() -> Dict[str, Any]:
-    """Get current application health status"""
+@functools.lru_cache(maxsize=1)
+def _health_settings() -> Dict[str, Any]:
+    """
+    Static part of the health payload, read from the environment once.
+    Resolved on first health check rather than at import, so values loaded by load_dotenv() are seen.
+    """
     return {
-        "status": "healthy",
-        "timestamp": datetime.utcnow().isoformat(),
         "version": "1.0.0",
         "environment": os.getenv("ENVIRONMENT", "development"),
         "metrics_enabled": os.getenv("PROMETHEUS_METRICS_ENABLED", "true").lower() == "true"
     }
 
 
-def timing_decorator(operation: str):
-    """
-    Decorator to measure operation timing and record metrics.
-
-    Args:
-        operation: Name of the operation being timed
-    """
-
-    def decorator(func: Callable) -> Callable:
-        @functools.wraps(func)
-        async def async_wrapper(*args, **kwargs):
-            start_time = time.time()
-            status = "success"
-            try:
-                result = await func(*args, **kwargs)
-                return result
-            except Exception as e:
-                status = "error"
-                metrics.record_error(type(e).__name__, operation)
-                raise
-            finally:
-                duration = time.time() - start_time
-                TICKET_PROCESSING_TIME.labels(operation=operation, status=status).observe(duration)
-                logger.info(
-                    "Operation completed",
-                    operation=operation,
-                    duration_ms=round(duration * 1000, 2),
-                    status=status
-                )
-
-        @functools.wraps(func)
-        def sync_wrapper(*args, **kwargs):
-            start_time = time.time()
-            status = "success"
-            try:
-                result = func(*args, **kwargs)
-                return result
-            except Exception as e:
-                status = "error"
-                metrics.record_error(type(e).__name__, operation)
-                raise
-            finally:
-                duration = time.time() - start_time
-                TICKET_PROCESSING_TIME.labels(operation=operation, status=status).observe(duration)
-                logger.info(
-                    "Operation completed",
-                    operation=operation,
-                    duration_ms=round(duration * 1000, 2),
-                    status=status
-                )
-
-        return async_wrapper if asyncio.iscoroutinefunction(func) else sync_wrapper
-
-    return decorator
+def get_health_status() -> Dict[str, Any]:
+    """Get current application health status"""
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        **_health_settings()
+    }